@@ -35,6 +35,8 @@ set TASKN ordered;
 param TASKS{TASKN} >= 0 integer; # START
 param TASKE{TASKN} >= 0 integer; # END
 param TASKW{TASKN} >= 0 integer; # WORK
+param TASKR{TASKN} >= 0 default 0; # WORK RESERVED FOR THE DAYS AFTER THE WINDOW
+param TASKU{t in TASKN} >= 0 default TASKW[t]; # WORK WHICH THE DAYS AFTER THE WINDOW CAN TAKE
 
 check {t in TASKN}:
     0 <= TASKS[t] <= TASKE[t];
@@ -94,8 +96,9 @@ param OFFDAY{1..OFFDAY_NO} integer, >=1, <= DAY_NO;
 # The number of bounds
 param XBDAY_NO integer, >= 0;
 
-# The set of bounds definition: EXPERT, TASK, DAY, LOWER, UPPER
-param XBDAY{1..XBDAY_NO, 1..5} symbolic;
+# The set of bounds definition: EXPERT, TASK, START, END, LOWER, UPPER
+# The bounds apply to each single working day from START to END.
+param XBDAY{1..XBDAY_NO, 1..6} symbolic;
 
 check {k in 1..XBDAY_NO}:
     XBDAY[k,1] in EXPERTN;
@@ -104,10 +107,10 @@ check {k in 1..XBDAY_NO}:
     XBDAY[k,2] in TASKN;
 
 check {k in 1..XBDAY_NO}:
-    TASKS[XBDAY[k,2]] <= XBDAY[k,3] <= TASKE[XBDAY[k,2]];
+    TASKS[XBDAY[k,2]] <= XBDAY[k,3] <= XBDAY[k,4] <= TASKE[XBDAY[k,2]];
 
 check {k in 1..XBDAY_NO}:
-    0 <= XBDAY[k,4] <= XBDAY[k,5] <= HOURS_PER_DAY;
+    0 <= XBDAY[k,5] <= XBDAY[k,6] <= HOURS_PER_DAY;
     
 
 
@@ -132,17 +135,18 @@ check {k in 1..XBSUM_NO}:
 # The number of bounds
 param UBDAY_NO integer, >= 0;
 
-# The set of bounds definition: EXPERT, DAY, LOWER, UPPER
-param UBDAY{1..UBDAY_NO, 1..4} symbolic;
+# The set of bounds definition: EXPERT, START, END, LOWER, UPPER
+# The bounds apply to each single working day from START to END.
+param UBDAY{1..UBDAY_NO, 1..5} symbolic;
 
 check {k in 1..UBDAY_NO}:
     UBDAY[k,1] in EXPERTN;
     
 check {k in 1..UBDAY_NO}:
-    1 <= UBDAY[k,2] <= DAY_NO;
+    1 <= UBDAY[k,2] <= UBDAY[k,3] <= DAY_NO;
     
 check {k in 1..UBDAY_NO}:
-    0 <= UBDAY[k,3] <= UBDAY[k,3];
+    0 <= UBDAY[k,4] <= UBDAY[k,5];
 
 
 
@@ -167,13 +171,55 @@ check {k in 1..UBSUM_NO}:
     
 
 
+# The window of days to be scheduled. By default it is the whole time horizon.
+# In the rolling-horizon mode the days before the window are already scheduled,
+# and the work not done in the window is carried over to the next one.
+param WINDOW_START integer, >= 1, default 1;
+param WINDOW_END integer, >= WINDOW_START, default DAY_NO;
+
+
+# The cells allowed in the refinement of the coarse-to-fine mode.
+# If the schedule is not RESTRICTED, all the cells are allowed.
+param RESTRICTED binary, default 0;
+set CELLS within {EXPERTN, 1..DAY_NO, TASKN} default {};
+
+
 # For each expert, the cost for each task
-var TASKDEV{EXPERTN, TASKN} >= 0;
+var TASKDEV{LINKS} >= 0;
+
+
+# The work of the task carried over to the next window.
+# Tasks ending within the window must be completed.
+# The work required by the lower bounds of the later days stays for them,
+# and no more work is carried over than the later days can take.
+var TASKREST{t in TASKN} >= TASKR[t], <= if TASKE[t] <= WINDOW_END then 0 else TASKU[t];
+
+
+# Weekends and holidays as a set, for quick membership tests
+set OFFDAYS := setof {k in 1..OFFDAY_NO} OFFDAY[k];
+
+
+# The index space of the schedule.
+# The tuple (e, d, t) exists only if expert "e" is linked with task "t",
+# the day "d" is within the task and the window, and "d" is a working day
+# (and the cell is allowed, if the schedule is restricted).
+# All other hours are zero, so they are not generated at all.
+set XIDX within {EXPERTN, 1..DAY_NO, TASKN} :=
+    setof {(e, t) in LINKS, d in max(TASKS[t], WINDOW_START)..min(TASKE[t], WINDOW_END):
+        d not in OFFDAYS and (RESTRICTED = 0 or (e, d, t) in CELLS)} (e, d, t);
 
 
 # X[e, d, t] means the number of hours assigned to expert "e" on day "d" for task "t"
-var X{EXPERTN, 1..DAY_NO, TASKN} integer, >=0, <= HOURS_PER_DAY;
+var X{XIDX} integer, >=0, <= HOURS_PER_DAY;
+
+
 
+# The index space of U: only the tuples counted by the C_ubday and C_ubsum constraints.
+# Without any ubday or ubsum rows there are no binary variables at all.
+set UIDX within XIDX :=
+    setof {k in 1..UBDAY_NO, d in UBDAY[k,2]..UBDAY[k,3], t in TASKN: (UBDAY[k,1], d, t) in XIDX} (UBDAY[k,1], d, t)
+    union
+    setof {k in 1..UBSUM_NO, d in UBSUM[k,3]..UBSUM[k,4]: (UBSUM[k,1], d, UBSUM[k,2]) in XIDX} (UBSUM[k,1], d, UBSUM[k,2]);
 
 
 #
@@ -181,70 +227,64 @@ var X{EXPERTN, 1..DAY_NO, TASKN} integer, >=0, <= HOURS_PER_DAY;
 # U[e, d, j] = |
 #              | 1 iff X[e, d, t] => 1
 #
-var U{EXPERTN, 1..DAY_NO, TASKN} binary;
+var U{UIDX} binary;
 
 
 # Objective function. This function has the clear meaning, fortunatelly.
+# The work carried over costs as much as if it was done on the first day after the window,
+# and more the sooner the deadline of the task, so the work of the later deadlines is carried over first.
 minimize objective_function:
-    sum {e in EXPERTN, t in TASKN} TASKDEV[e, t];
+    sum {(e, t) in LINKS} TASKDEV[e, t] +
+    sum {t in TASKN} (max(1, WINDOW_END + 1 - TASKS[t])^(1/3)) * (1 + 1 / max(1, TASKE[t] - WINDOW_END)) * TASKREST[t];
 
 
 # This is the part of the ojective function
-subject to C_CD_minimization {e in EXPERTN, t in TASKN}:
-    sum {d in TASKS[t]..TASKE[t]} ((d - TASKS[t])^(1/3)) * X[e, d, t] <= TASKDEV[e, t];
-
-
-# Dates not within the job have values zero
-subject to C_not_within {e in EXPERTN, t in TASKN, d in ({1..DAY_NO} diff {TASKS[t]..TASKE[t]})}:
-    X[e, d, t] = 0;
-
-
-subject to C_off {e in EXPERTN, t in TASKN, k in 1..OFFDAY_NO}:
-   X[e, OFFDAY[k], t] = 0;
+subject to C_CD_minimization {(e, t) in LINKS}:
+    sum {d in TASKS[t]..TASKE[t]: (e, d, t) in XIDX} ((d - TASKS[t])^(1/3)) * X[e, d, t] <= TASKDEV[e, t];
 
 
 # The upper and lower limit on the total number of working hours in the payroll
 subject to C_payroll {(e, i) in EXPPAY}:
-    PAYROLLBL[e, i] <= sum {d in PAYROLLS[i]..PAYROLLE[i], (e, t) in LINKS} X[e, d, t] <= PAYROLLBU[e, i];
+    PAYROLLBL[e, i] <= sum {(e, d, t) in XIDX: PAYROLLS[i] <= d <= PAYROLLE[i]} X[e, d, t] <= PAYROLLBU[e, i];
 
 
 # The total number of working hours in the task
 subject to C_task_work {t in TASKN}:
-    sum {(e, t) in LINKS, d in TASKS[t]..TASKE[t]} X[e, d, t] = TASKW[t];
+    sum {(e, d, t) in XIDX} X[e, d, t] + TASKREST[t] = TASKW[t];
 
 
 # The total number of working hours per day
-subject to C_hours_per_day {e in EXPERTN, d in 1..DAY_NO}:
-    sum {(e, t) in LINKS} X[e, d, t] <= HOURS_PER_DAY;
+subject to C_hours_per_day {e in EXPERTN, d in (WINDOW_START..WINDOW_END) diff OFFDAYS}:
+    sum {(e, d, t) in XIDX} X[e, d, t] <= HOURS_PER_DAY;
 
 
-subject to C_xbday {k in 1..XBDAY_NO}:
-    XBDAY[k,4] <= X[ XBDAY[k,1], XBDAY[k,3], XBDAY[k,2] ] <= XBDAY[k,5];
+subject to C_xbday {k in 1..XBDAY_NO, d in XBDAY[k,3]..XBDAY[k,4]: (XBDAY[k,1], d, XBDAY[k,2]) in XIDX}:
+    XBDAY[k,5] <= X[ XBDAY[k,1], d, XBDAY[k,2] ] <= XBDAY[k,6];
     
     
 subject to C_xbsum {k in 1..XBSUM_NO}:
-    XBSUM[k,5] <= sum {d in XBSUM[k,3]..XBSUM[k,4]} X[ XBSUM[k,1], d, XBSUM[k,2] ] <= XBSUM[k,6];
+    XBSUM[k,5] <= sum {d in XBSUM[k,3]..XBSUM[k,4]: (XBSUM[k,1], d, XBSUM[k,2]) in XIDX} X[ XBSUM[k,1], d, XBSUM[k,2] ] <= XBSUM[k,6];
 
 
 # The lower and upper bounds on the total number of working hours per day
-subject to C_ebound {k in 1..EBOUND_NO, d in EBOUND[k,2]..EBOUND[k,3]}:
-    EBOUND[k,4] <= sum{(e, t) in LINKS: e = EBOUND[k,1]} X[e, d, t] <= EBOUND[k,5];
+subject to C_ebound {k in 1..EBOUND_NO, d in (max(EBOUND[k,2], WINDOW_START)..min(EBOUND[k,3], WINDOW_END)) diff OFFDAYS}:
+    EBOUND[k,4] <= sum{(e, d, t) in XIDX: e = EBOUND[k,1]} X[e, d, t] <= EBOUND[k,5];
 
 
 
 # Constraint enforcing the value of U: lower bound
-subject to C_use_lower {e in EXPERTN, d in 1..DAY_NO, t in TASKN}:
+subject to C_use_lower {(e, d, t) in UIDX}:
     U[e, d, t] <= X[e, d, t];
 
 
 # Constraint enforcing the value of U: upper bound
-subject to C_use_upper {e in EXPERTN, d in 1..DAY_NO, t in TASKN}:
+subject to C_use_upper {(e, d, t) in UIDX}:
     U[e, d, t] * HOURS_PER_DAY >= X[e, d, t];
 
 
-subject to C_ubday {k in 1..UBDAY_NO}:
-    UBDAY[k,3] <= sum { (e, t) in LINKS: e = UBDAY[k,1] } U[ e, UBDAY[k,2], t ] <= UBDAY[k,4];
+subject to C_ubday {k in 1..UBDAY_NO, d in (max(UBDAY[k,2], WINDOW_START)..min(UBDAY[k,3], WINDOW_END)) diff OFFDAYS}:
+    UBDAY[k,4] <= sum { (e, t) in LINKS: e = UBDAY[k,1] and (e, d, t) in UIDX } U[ e, d, t ] <= UBDAY[k,5];
 
 
 subject to C_ubsum {k in 1..UBSUM_NO}:
-    UBSUM[k,5] <= sum { d in UBSUM[k,3]..UBSUM[k,4] } U[ UBSUM[k,1], d, UBSUM[k,2] ] <= UBSUM[k,6];
+    UBSUM[k,5] <= sum { d in UBSUM[k,3]..UBSUM[k,4]: (UBSUM[k,1], d, UBSUM[k,2]) in UIDX } U[ UBSUM[k,1], d, UBSUM[k,2] ] <= UBSUM[k,6];
@@ -1,8 +1,8 @@
 import io
 import streamlit as st
 import matplotlib
+import romz_calendar
 import romz_datetime
-import pandas as pd
 import glb
 import time
 
@@ -14,7 +14,7 @@ def plot(task, schedule, bounds):
     time_start = time.perf_counter()
 
     # Generate task-specific data
-    x_task = pd.date_range(start=task.Start, end=task.End, freq="D")
+    x_task = romz_calendar.dates(glb.data["calendar"], task.Start, task.End)
     y_task = schedule.loc[task.Name, x_task]
 
     # Create figure and axis
@@ -37,7 +37,7 @@ def plot(task, schedule, bounds):
 
     # Add task bounds
     for row in bounds.itertuples(index=False):
-        bound_days = pd.date_range(start=row.Start, end=row.End, freq="D")
+        bound_days = romz_calendar.dates(glb.data["calendar"], row.Start, row.End)
         ax.fill_between(bound_days,
                         row.Lower,
                         row.Upper,
@@ -1,9 +1,44 @@
+import collections.abc
 import datetime
-import streamlit as st
+import pandas as pd
 import tempfile
+import threading
+import time
+import romz_cache
 import romz_excel
 
-data = dict()
+
+# The data of the session bound to the current thread.
+# Each Streamlit session runs in its own threads, so the sessions never see each other's data.
+# Without a bound session (e.g. in the batch runner) one dict is shared by the whole process.
+class SessionData(collections.abc.MutableMapping):
+    def __init__(self):
+        self.shared = {}
+        self.local = threading.local()
+
+    def bind(self, session):
+        self.local.session = session
+
+    def session(self):
+        return getattr(self.local, "session", self.shared)
+
+    def __getitem__(self, key):
+        return self.session()[key]
+
+    def __setitem__(self, key, value):
+        self.session()[key] = value
+
+    def __delitem__(self, key):
+        del self.session()[key]
+
+    def __iter__(self):
+        return iter(self.session())
+
+    def __len__(self):
+        return len(self.session())
+
+
+data = SessionData()
 
 def himg(col):
     return data["himg"].iloc[0][col]
@@ -23,6 +58,13 @@ def bimg(col):
 def gimg(col):
     return data["gimg"].iloc[0][col]
 
+# Optional settings in the "misc" sheet. The default is used if the column is missing or empty.
+def misc(col, default=None):
+    df = data["misc"]
+    if col not in df.columns or pd.isna(df.iloc[0][col]):
+        return default
+    return df.iloc[0][col]
+
 def hours_per_day():
     return data["misc"].iloc[0]["Hours per day"]
 
@@ -36,8 +78,34 @@ def tomorrow():
 def last_day():
     return max(data["tasks"]["End"].max(), data["invoicing periods"]["End"].max())
 
+# Read the workbook (its bytes) into data. The same workbook is parsed only once, in any session.
+def load(workbook):
+    start = time.perf_counter()
+    digest = romz_cache.digest(workbook)
+    key = ("workbook", digest, romz_excel.names)
+    tables = romz_cache.get(key)
+    if tables is None:
+        with tempfile.NamedTemporaryFile(suffix=".xlsx") as f:
+            f.write(workbook)
+            f.flush()
+            romz_excel.read(f.name)
+        romz_cache.put(key, romz_excel.tables())
+    else:
+        data.update(tables)
+    data["workbook digest"] = digest
+    data["parse time"] = time.perf_counter() - start
+
+
+# Bind data to the session of Streamlit running in this thread
+def bind_session():
+    # Streamlit is imported here, so that the batch runner works without it
+    import streamlit as st
+    data.bind(st.session_state.setdefault('key:glb.data', {}))
+
+
 def prepare(uploaded_file):
-    global data
+    import streamlit as st
+    import romz_job
 
     if 'key:uploaded_file' in st.session_state:
         new_input = ( st.session_state['key:uploaded_file'] != uploaded_file )
@@ -45,14 +113,14 @@ def prepare(uploaded_file):
         new_input = True
 
     if new_input:
-        with tempfile.NamedTemporaryFile(suffix=".xlsx") as f:
-            f.write(uploaded_file.getvalue())
-            f.flush()
-            romz_excel.read(f.name)
-        st.session_state['key:glb.data'] = data
+        # The solve of the previous input must not write into the data of the session any more
+        romz_job.cancel(st.session_state.get("key:solve job"))
+
+        # The last schedule of this session is the starting point for the new solve
+        previous = {k: v for k, v in data.items() if k.startswith("schedule ")}
+        load(uploaded_file.getvalue())
+        data["previous schedule"] = previous
         st.session_state['key:uploaded_file'] = uploaded_file
-    else:
-        data = st.session_state['key:glb.data']
 
     return new_input
 
@@ -2,6 +2,7 @@ import pandas as pd
 import io
 import streamlit as st
 import matplotlib
+import romz_calendar
 import romz_datetime
 import glb
 import time
@@ -15,7 +16,7 @@ def plot_df(df):
     end = glb.himg("End")
 
     # Generate the date range as string
-    days = pd.date_range(start=start, end=end, freq="D")
+    days = romz_calendar.dates(glb.data["calendar"], start, end)
 
     # Sum the hours for each day
     hours_per_day = df[days].sum()
@@ -2,8 +2,10 @@ import datetime
 import os
 import pandas as pd
 import streamlit as st
-import romz_ampl
+import romz_check
 import romz_datetime
+import romz_job
+import romz_scenario
 import himg
 import wimg
 import simg
@@ -52,9 +54,26 @@ def show_commitment_per_task(expert_name):
             bimg.plot(task, schedule, bounds)
 
 
+def preview_label():
+    return " :orange[(preview)]" if glb.data["preview"] else ""
+
+
+# The best incumbent is shown when a limit is hit
+def limit_label():
+    if glb.data.get("solve result") != "limit":
+        return ""
+    gap = glb.data["solver gap"]
+    return " :orange[(limit hit, gap unknown)]" if gap is None else f" :orange[(limit hit, gap {gap:.2%})]"
+
+
+# The greedy heuristic failed and the exact model was solved instead
+def heuristic_label():
+    return " :orange[(greedy heuristic failed, solved by HiGHS)]" if glb.data.get("heuristic failure") else ""
+
+
 def show_summary():
     if glb.data["show_experts_overview"]:
-        st.subheader(":blue[Experts overview]", divider="blue")
+        st.subheader(f":blue[Experts overview]{preview_label()}{limit_label()}{heuristic_label()}", divider="blue")
         col1, col2, col3 = st.columns(3)
         with col1:
             gimg.plot_summary()
@@ -65,10 +84,62 @@ def show_summary():
 
 
 def show_solver_output():
-    st.subheader(f":green[Solver output at {glb.data['solver timestamp']}]", divider="blue")
+    st.subheader(f":green[Solver output at {glb.data['solver timestamp']}]{preview_label()}{limit_label()}{heuristic_label()}", divider="blue")
     st.code(glb.data["solver output"])
 
 
+def show_solve_statistics():
+    st.subheader(":green[Solve phases and model statistics]", divider="blue")
+    times = pd.DataFrame(list(glb.data["solve times"].items()), columns=["Phase", "Elapsed time [s]"])
+    cols = st.columns(3)
+    with cols[0]:
+        st.dataframe(times.style.format({"Elapsed time [s]": "{:.3f}"}), hide_index=True, use_container_width=True)
+    # The statistics of a schedule taken from the cache may be missing
+    if "model variables" in glb.data:
+        with cols[1]:
+            st.dataframe(glb.data["model variables"], hide_index=True, use_container_width=True)
+        with cols[2]:
+            st.dataframe(glb.data["model constraints"], hide_index=True, use_container_width=True)
+            st.caption(f"Nonzeros seen by the solver: {glb.data['model nonzeros']}")
+
+
+# The what-if scenarios of the workbook, solved on request and compared in one table
+def show_scenarios():
+    st.subheader(":green[What-if scenarios]", divider="blue")
+    st.caption("Changes: hours per day (Value in hours), deadline (Name of the task, Value in days), "
+               "absence (Name of the expert, Start and End). The rows with the same Scenario make one scenario.")
+
+    empty = pd.DataFrame({
+        "Scenario": pd.Series(dtype=str),
+        "Change": pd.Series(dtype=str),
+        "Name": pd.Series(dtype=str),
+        "Value": pd.Series(dtype=float),
+        "Start": pd.Series(dtype="datetime64[ns]"),
+        "End": pd.Series(dtype="datetime64[ns]"),
+    })
+    table = st.data_editor(
+        empty,
+        num_rows="dynamic",
+        use_container_width=True,
+        column_config={
+            "Change": st.column_config.SelectboxColumn(options=list(romz_scenario.changes)),
+            "Start": st.column_config.DateColumn(),
+            "End": st.column_config.DateColumn(),
+        },
+        key="key:scenarios",
+    )
+
+    if st.button("Solve scenarios"):
+        try:
+            with st.spinner("Solving the scenarios..."):
+                glb.data["scenarios"] = romz_scenario.run(table.dropna(subset=["Scenario", "Change"]))
+        except Exception as e:
+            st.subheader(f":red[Exception during solving process.] {e}")
+
+    if "scenarios" in glb.data:
+        st.dataframe(glb.data["scenarios"], hide_index=True, use_container_width=True)
+
+
 def show_one_row(expert_name):
     report_column_no = glb.data["report_column_no"]
     col_list = st.columns(report_column_no)
@@ -95,7 +166,7 @@ def show_all_rows():
 
     for row in experts.itertuples(index=False):
         expert_name = row.Name
-        st.subheader(f":blue[{expert_name}] {row.Comment}", divider="blue")
+        st.subheader(f":blue[{expert_name}] {row.Comment}{preview_label()}", divider="blue")
 
         if report.at[expert_name, "Charts"]:
             show_one_row(expert_name)
@@ -167,6 +238,8 @@ def show_main_panel():
     show_summary()
     show_all_rows()
     show_solver_output()
+    show_solve_statistics()
+    show_scenarios()
     show_time_counters()
 
 
@@ -212,10 +285,54 @@ def zero_time_counters():
         glb.data[f"time:{v}:val"] = 0
 
 
+# The problems found in the workbook before solving, with the offending rows
+def show_input_issues():
+    issues = glb.data["input issues"]
+    if not issues:
+        return False
+    st.subheader(":red[The workbook cannot be solved.]", divider="blue")
+    for description, rows in issues:
+        st.caption(description)
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+    return True
+
+
+# Start solving in the background. The solve running for the previous input is cancelled.
+def solve(name, preview):
+    romz_job.close(st.session_state.get("key:solve job"))
+    st.session_state["key:solve job"] = romz_job.start(name, preview)
+
+
+# The live solver log, refreshed every second while the page keeps responding.
+# The whole page is run again when the solve is finished.
+@st.fragment(run_every=1)
+def show_solve_progress():
+    job = st.session_state["key:solve job"]
+    if not romz_job.running(job):
+        st.rerun()
+
+    st.subheader(":orange[Solving...]", divider="blue")
+    if st.button("Cancel"):
+        romz_job.cancel(job)
+        st.rerun()
+    st.code(romz_job.log(job))
+
+
+def show_solve_error(job):
+    if job["error"] is None:
+        return False
+    if romz_job.cancelled(job):
+        st.subheader(":red[Solving process cancelled.]")
+    else:
+        st.subheader(f":red[Exception during solving process.] {job['error']}")
+    return True
+
+
 def main():
     # plt.style.use('seaborn-v0_8-whitegrid')
     set_page_config()
     show_page_header()
+    glb.bind_session()
     zero_time_counters()
 
     with st.sidebar:
@@ -228,10 +345,34 @@ def main():
         return
 
     if new_input:
-        try:
-            romz_ampl.solve(uploaded_file.name)
-        except Exception as e:
-            st.subheader(f":red[Exception during solving process.] {e}")
+        # Only the workbooks passing the pre-solve analysis are solved
+        romz_job.cancel(st.session_state.get("key:solve job"))
+        glb.data["input issues"] = romz_check.analyse()
+        glb.data.pop("scenarios", None)
+        if not glb.data["input issues"]:
+            solve(uploaded_file.name, glb.data["preview mode"])
+
+    if show_input_issues():
+        return
+
+    job = st.session_state["key:solve job"]
+    if romz_job.running(job):
+        show_solve_progress()
+        return
+
+    if show_solve_error(job):
+        return
+
+    if glb.data["preview"]:
+        notice = st.empty()
+        with notice.container():
+            st.warning("The schedule is a preview: the LP relaxation rounded to whole units of time. "
+                       "Some bounds may be violated.")
+            exact = st.button("Solve exact MILP")
+        if exact:
+            notice.empty()
+            solve(uploaded_file.name, False)
+            show_solve_progress()
             return
 
     show_main_panel()
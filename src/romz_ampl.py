@@ -1,337 +1,1087 @@
 import datetime
+import itertools
 import numpy as np
 import pandas as pd
-import os
-import romz_datetime
-from amplpy import AMPL, modules
+import time
+from amplpy import OutputHandler
+from contextlib import contextmanager
+import romz_cache
+import romz_calendar
+import romz_greedy
+import romz_highs
+import romz_pool
 import glb
 
-quarters_in_hour = 4
+# The number of time units in one hour. The hours of the model are whole units.
+# By default the unit is a quarter of an hour.
+def units_per_hour():
+    return int(glb.misc("Units per hour", 4))
 
-def tasks():
-    today = glb.today()
-    df = glb.data["tasks"]
 
-    # Calculate start and end days relative to today
-    df["Start Relative"] = (df["Start"] - today).dt.days
-    df["End Relative"] = (df["End"] - today).dt.days
+# Hours converted to whole units, as in the coarse-to-fine mode: the work is rounded,
+# the lower bounds are rounded down and the upper bounds up (but not above the most units).
+def work_units(hours):
+    return np.rint(np.asarray(hours, dtype=float) * units_per_hour()).astype(int)
 
-    # Use vectorized string formatting for better performance
-    formatted_rows = df.apply(
-        lambda row: f"'{row['Name']}' {row['Start Relative']} {row['End Relative']} "
-        f"{row['Work'] * quarters_in_hour}\n",
-        axis=1,
-    )
 
-    df.drop(columns=["Start Relative", "End Relative"], inplace=True)
+def lower_units(hours):
+    return np.floor(np.asarray(hours, dtype=float) * units_per_hour() + 1e-6)
 
-    return ''.join(formatted_rows)
-
-
-def offday():
-    today = glb.today()
-    # Determine the date range
-    min_date = glb.data["tasks"]["Start"].min()
-    max_date = glb.data["tasks"]["End"].max()
 
-    # Generate weekends within the range using a mask for Saturdays and Sundays
-    weekends = pd.bdate_range(start=min_date, end=max_date, freq='C', weekmask='Sat Sun')
-    holidays = glb.data["public holidays"]["Date"]
+def upper_units(hours, most=np.inf):
+    return np.minimum(np.ceil(np.asarray(hours, dtype=float) * units_per_hour() - 1e-6), most)
 
-    # Combine weekends and holidays into a sorted list
-    # The set off_days is the union of weekends and holidays.
-    # Sorting is not necessary. However, it does give deterministic (repetitive) results.
-    off_days = sorted(set(weekends.union(holidays)))
 
-    # Create the result buffer
-    buf = "\n".join(f"{idx + 1} {(day - today).days}" for idx, day in enumerate(off_days))
+# The whole units of one working day
+def hours_per_day_units():
+    return int(lower_units(glb.hours_per_day()))
 
-    return len(off_days), buf
 
+# The coarse units per hour of the coarse-to-fine mode. Zero if the mode is off.
+def coarse_units():
+    coarse = float(glb.misc("Coarse units per hour", 0))
+    return coarse if 0 < coarse < units_per_hour() else 0
 
-def xbday():
-    today = glb.today()
-    # Preprocessing for efficient lookups
-    df = glb.data["xbday"]
-    df_tasks = glb.data["tasks"].set_index("Name")  # Set "Name" as index for quick task lookup
-    holidays = set(glb.data["public holidays"]["Date"])  # Convert holidays to a set for faster checks
-
-    result = []
-    id_counter = 0
-
-    # Iterate efficiently using itertuples
-    for row in df.itertuples(index=False):
-        task_name = row.Task
-        expert_name = row.Expert
-        lower = row.Lower * quarters_in_hour
-        upper = row.Upper * quarters_in_hour
-
-        # Calculate valid date range considering task bounds and xbday range
-        task_start, task_end = df_tasks.loc[task_name, ["Start", "End"]]
-        range_start = max(row.Start, task_start)
-        range_end = min(row.End, task_end)
-        # Generate business days using pandas
-        valid_days = pd.bdate_range(
-            start=range_start,
-            end=range_end,
-            freq="C",
-            holidays=holidays,
-            weekmask="Mon Tue Wed Thu Fri"
-        )
 
-        # Process valid days
-        for d in valid_days:
-            day_offset = (d - today).days
-            id_counter += 1
-            result.append(f"{id_counter} '{expert_name}' '{task_name}' {day_offset} {lower} {upper}")
+# Add the elapsed time of the block to the phase in the times dict
+@contextmanager
+def phase(times, name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        times[name] = times.get(name, 0) + time.perf_counter() - start
 
-    # Combine results into a single string and return
-    return id_counter, "\n".join(result)
 
+# The times of the phases summed over the results
+def total_times(results):
+    times = {}
+    for r in results:
+        for name, value in r["times"].items():
+            times[name] = times.get(name, 0) + value
+    return times
 
 
+# The sizes of the solved instances summed over the results. None if no model was built (greedy).
+# The nonzeros of a constraint family are None if the engine does not count them.
+def total_statistics(results):
+    found = [r["statistics"] for r in results if r.get("statistics") is not None]
+    if not found:
+        return None
+    variables, constraints = {}, {}
+    for s in found:
+        for name, count in s["variables"].items():
+            variables[name] = variables.get(name, 0) + count
+        for name, (rows, nonzeros) in s["constraints"].items():
+            total_rows, total_nonzeros = constraints.get(name, (0, 0))
+            if nonzeros is not None and total_nonzeros is not None:
+                nonzeros += total_nonzeros
+            constraints[name] = (total_rows + rows, nonzeros)
+    return {"variables": variables, "constraints": constraints, "nonzeros": sum(s["nonzeros"] for s in found)}
 
-def xbsum():
+def tasks():
     today = glb.today()
-    df = glb.data["xbsum"]
-    result = []
+    df = glb.data["tasks"]
 
-    # Iterate over rows using itertuples for better performance
-    for idx, row in enumerate(df.itertuples(index=False), start=1):
-        expert = row.Expert
-        task = row.Task
-        start = (row.Start - today).days
-        end = (row.End - today).days
-        lower = row.Lower * quarters_in_hour
-        upper = row.Upper * quarters_in_hour
+    # Start and end days relative to today, work in units
+    return pd.DataFrame({
+        "TASKS": (df["Start"] - today).dt.days.to_numpy(),
+        "TASKE": (df["End"] - today).dt.days.to_numpy(),
+        "TASKW": work_units(df["Work"]),
+    }, index=df["Name"].to_numpy())
 
-        # Append formatted string to result list
-        result.append(f"{idx} '{expert}' '{task}' {start} {end} {lower} {upper}")
 
-    # Join the result list with newline characters
-    return len(result), "\n".join(result)
+# Weekends and holidays from tomorrow to the last day, relative to today
+def offday():
+    calendar = glb.data["calendar"]
+    days = romz_calendar.dates(calendar, glb.tomorrow(), glb.last_day())
+    return (days[~romz_calendar.is_working(calendar, days)] - glb.today()).days.tolist()
 
 
-def ubday():
+# The bounds of each single day of the range, cut to the range of the task.
+# The off days are skipped by the model.
+def xbday():
     today = glb.today()
-    df = glb.data["ubday"]
-    holidays = set(glb.data["public holidays"]["Date"])
+    df = glb.data["xbday"]
+    tasks = glb.data["tasks"].set_index("Name").reindex(df["Task"])
+    result = pd.DataFrame({
+        "Expert": df["Expert"].to_numpy(),
+        "Task": df["Task"].to_numpy(),
+        "Start": np.maximum((df["Start"] - today).dt.days.to_numpy(), (tasks["Start"] - today).dt.days.to_numpy()),
+        "End": np.minimum((df["End"] - today).dt.days.to_numpy(), (tasks["End"] - today).dt.days.to_numpy()),
+        "Lower": lower_units(df["Lower"]),
+        "Upper": upper_units(df["Upper"], hours_per_day_units()),
+    })
+    return result[result["Start"] <= result["End"]].reset_index(drop=True)
 
-    result = []
-    id = 0
 
-    for row in df.itertuples(index=False):
-        # Generate business days excluding holidays
-        valid_days = pd.bdate_range(start=row.Start, end=row.End, freq='C', holidays=holidays)
+def xbsum():
+    today = glb.today()
+    df = glb.data["xbsum"]
+    return pd.DataFrame({
+        "Expert": df["Expert"].to_numpy(),
+        "Task": df["Task"].to_numpy(),
+        "Start": (df["Start"] - today).dt.days.to_numpy(),
+        "End": (df["End"] - today).dt.days.to_numpy(),
+        "Lower": lower_units(df["Lower"]),
+        "Upper": upper_units(df["Upper"]),
+    })
 
-        # Format the output
-        for day in valid_days:
-            id += 1
-            relative_day = (day - today).days
-            result.append(f"{id} '{row.Expert}' {relative_day} {row.Lower} {row.Upper}")
 
-    return id, "\n".join(result)
+# The bounds of each single day of the range. The off days are skipped by the model.
+def ubday():
+    today = glb.today()
+    df = glb.data["ubday"]
+    return pd.DataFrame({
+        "Expert": df["Expert"].to_numpy(),
+        "Start": (df["Start"] - today).dt.days.to_numpy(),
+        "End": (df["End"] - today).dt.days.to_numpy(),
+        "Lower": df["Lower"].to_numpy(),
+        "Upper": df["Upper"].to_numpy(),
+    })
 
 
 def ubsum():
     today = glb.today()
     df = glb.data["ubsum"]
-    result = [
-        f"{id+1} '{row.Expert}' '{row.Task}' {(row.Start - today).days} "
-        f"{(row.End - today).days} "
-        f"{row.Lower} {row.Upper}"
-        for id, row in enumerate(df.itertuples(index=False))
-    ]
-    return len(result), "\n".join(result)
+    return pd.DataFrame({
+        "Expert": df["Expert"].to_numpy(),
+        "Task": df["Task"].to_numpy(),
+        "Start": (df["Start"] - today).dt.days.to_numpy(),
+        "End": (df["End"] - today).dt.days.to_numpy(),
+        "Lower": df["Lower"].to_numpy(),
+        "Upper": df["Upper"].to_numpy(),
+    })
 
 
 def experts():
-    return "\n".join(f"'{name}'" for name in glb.data["experts"]["Name"])
+    return glb.data["experts"]["Name"].tolist()
 
 
 def expert_bounds():
     today = glb.today()
     df = glb.data["expert bounds"]
-    result = [
-        f"{id+1} '{row.Expert}' {(row.Start - today).days} "
-        f"{(row.End - today).days} "
-        f"{row.Lower * quarters_in_hour} "
-        f"{row.Upper * quarters_in_hour}"
-        for id, row in enumerate(df.itertuples(index=False))
-    ]
-    return len(result), "\n".join(result)
+    return pd.DataFrame({
+        "Expert": df["Expert"].to_numpy(),
+        "Start": (df["Start"] - today).dt.days.to_numpy(),
+        "End": (df["End"] - today).dt.days.to_numpy(),
+        "Lower": lower_units(df["Lower"]),
+        "Upper": upper_units(df["Upper"], hours_per_day_units()),
+    })
 
 
 def links():
     df = glb.data["links"]
-    return "\n".join(f"'{expert}' '{task}'" for expert, task in zip(df["Expert"], df["Task"]))
+    return list(zip(df["Expert"], df["Task"]))
 
 
 def invoicing_periods():
     today = glb.today()
     df = glb.data["invoicing periods"]
-    result = [
-        f"'{row.Name}' {(row.Start - today).days} {(row.End - today).days}"
-        for row in df.itertuples(index=False)
-    ]
-    return "\n".join(result)
+    return pd.DataFrame({
+        "PAYROLLS": (df["Start"] - today).dt.days.to_numpy(),
+        "PAYROLLE": (df["End"] - today).dt.days.to_numpy(),
+    }, index=df["Name"].to_numpy())
 
 
 def invoicing_periods_bounds():
-    today = glb.today()
     df = glb.data["invoicing periods bounds"]
-    return "\n".join(
-        f"'{expert}' '{period}' "
-        f"{lower * quarters_in_hour} "
-        f"{upper * quarters_in_hour}"
-        for expert, period, lower, upper in zip(df["Expert"], df["Period"], df["Lower"], df["Upper"])
-    )
+    return pd.DataFrame({
+        "PAYROLLBL": lower_units(df["Lower"]),
+        "PAYROLLBU": upper_units(df["Upper"]),
+    }, index=pd.MultiIndex.from_arrays([df["Expert"], df["Period"]]))
+
+
+# All the data of the AMPL model, translated from the Excel sheets
+def translate():
+    return {
+        "UNITS_PER_HOUR": units_per_hour(),
+        "HOURS_PER_DAY": hours_per_day_units(),
+        "EXPERTN": experts(),
+        "EBOUND": expert_bounds(),
+        "TASKN": tasks(),
+        "PAYROLLN": invoicing_periods(),
+        "EXPPAY": invoicing_periods_bounds(),
+        "OFFDAY": offday(),
+        "XBDAY": xbday(),
+        "XBSUM": xbsum(),
+        "UBDAY": ubday(),
+        "UBSUM": ubsum(),
+        "LINKS": links(),
+    }
 
 
-def data_file(name):
-    ampl_data_file = "./ampl-translated-from-excel/{}.dat".format(name)
-    with open(ampl_data_file, 'w') as f:
-        f.write(f'param HOURS_PER_DAY := {glb.hours_per_day() * quarters_in_hour};\n\n')
+# Values of the two-dimensional parameter P{1..P_NO, 1..n}, where n is the number of columns
+def table_values(df):
+    df = df.set_axis(range(1, df.shape[0] + 1), axis=0).set_axis(range(1, df.shape[1] + 1), axis=1)
+    return {k: v.item() if isinstance(v, np.generic) else v for k, v in df.stack().items()}
 
-        buf = experts()
-        f.write('set EXPERTN :=\n')
-        f.write(buf)
-        f.write(';\n\n')
 
-        expert_bound_no, buf = expert_bounds()
-        f.write(f'param EBOUND_NO := {expert_bound_no};\n\n')
-        f.write('param EBOUND:\n')
-        f.write('1   2   3   4   5 :=\n')
-        f.write(buf)
-        f.write(';\n\n')
+def load_table(ampl, name, df):
+    ampl.param[f"{name}_NO"] = df.shape[0]
+    if not df.empty:
+        ampl.param[name] = table_values(df)
 
-        buf = tasks()
-        f.write('param:\n')
-        f.write('TASKN: TASKS TASKE TASKW :=\n')
-        f.write(buf)
-        f.write(';\n\n')
 
-        buf = invoicing_periods()
-        f.write('param:\n')
-        f.write('PAYROLLN: PAYROLLS PAYROLLE :=\n')
-        f.write(buf)
-        f.write(';\n\n')
+def load_indexed(ampl, name, df):
+    if df.empty:
+        ampl.set[name] = []
+    else:
+        ampl.set_data(df, name)
 
-        buf = invoicing_periods_bounds()
-        f.write('param:\n')
-        f.write('EXPPAY: PAYROLLBL PAYROLLBU :=\n')
-        f.write(buf)
-        f.write(';\n\n')
 
-        offday_no, buf = offday()
-        f.write(f'param OFFDAY_NO := {offday_no};\n\n')
-        f.write('param OFFDAY :=\n')
-        f.write(buf)
-        f.write(';\n\n')
+# Push the data straight into AMPL, without the intermediate text file
+def load_data(ampl, data):
+    ampl.param["HOURS_PER_DAY"] = data["HOURS_PER_DAY"]
+    ampl.set["EXPERTN"] = data["EXPERTN"]
+    load_table(ampl, "EBOUND", data["EBOUND"])
+    load_indexed(ampl, "TASKN", data["TASKN"])
+    load_indexed(ampl, "PAYROLLN", data["PAYROLLN"])
+    load_indexed(ampl, "EXPPAY", data["EXPPAY"])
+    ampl.param["OFFDAY_NO"] = len(data["OFFDAY"])
+    if data["OFFDAY"]:
+        ampl.param["OFFDAY"] = {idx: day for idx, day in enumerate(data["OFFDAY"], start=1)}
+    load_table(ampl, "XBDAY", data["XBDAY"])
+    load_table(ampl, "XBSUM", data["XBSUM"])
+    load_table(ampl, "UBDAY", data["UBDAY"])
+    load_table(ampl, "UBSUM", data["UBSUM"])
+    ampl.set["LINKS"] = data["LINKS"]
+    if "WINDOW" in data:
+        ampl.param["WINDOW_START"], ampl.param["WINDOW_END"] = data["WINDOW"]
+    if "CELLS" in data:
+        ampl.param["RESTRICTED"] = 1
+        ampl.set["CELLS"] = list(zip(data["CELLS"]["Expert"], data["CELLS"]["Day"].tolist(), data["CELLS"]["Task"]))
 
-        xbday_no, buf = xbday()
-        f.write(f'param XBDAY_NO := {xbday_no};\n\n')
-        f.write('param XBDAY:\n')
-        f.write('1   2   3   4   5 :=\n')
-        f.write(buf)
-        f.write(';\n\n')
 
-        xbsum_no, buf = xbsum()
-        f.write(f'param XBSUM_NO := {xbsum_no};\n\n')
-        f.write('param XBSUM:\n')
-        f.write('1   2   3   4   5   6 :=\n')
-        f.write(buf)
-        f.write(';\n\n')
+def dat_value(v):
+    return f"'{v}'" if isinstance(v, str) else f"{v}"
+
+
+def dat_rows(rows):
+    return "\n".join(" ".join(dat_value(v) for v in row) for row in rows)
+
+
+def write_table(f, name, df):
+    f.write(f'param {name}_NO := {df.shape[0]};\n\n')
+    f.write(f'param {name}:\n')
+    f.write("   ".join(str(j) for j in range(1, df.shape[1] + 1)) + ' :=\n')
+    f.write(dat_rows((k, *row) for k, row in enumerate(df.itertuples(index=False), start=1)))
+    f.write(';\n\n')
+
 
-        ubday_no, buf = ubday()
-        f.write(f'param UBDAY_NO := {ubday_no};\n\n')
-        f.write('param UBDAY:\n')
-        f.write('1   2   3   4 :=\n')
-        f.write(buf)
+def write_indexed(f, name, df):
+    f.write('param:\n')
+    f.write(f'{name}: {" ".join(df.columns)} :=\n')
+    index = (key if isinstance(key, tuple) else (key,) for key in df.index)
+    f.write(dat_rows((*key, *row) for key, row in zip(index, df.itertuples(index=False))))
+    f.write(';\n\n')
+
+
+# The same data written as the AMPL data file. Useful for debugging only.
+def data_file(name, data, directory=None):
+    ampl_data_file = "{}/{}.dat".format(directory or "./ampl-translated-from-excel", name)
+    with open(ampl_data_file, 'w') as f:
+        f.write(f'param HOURS_PER_DAY := {data["HOURS_PER_DAY"]};\n\n')
+
+        f.write('set EXPERTN :=\n')
+        f.write(dat_rows((e,) for e in data["EXPERTN"]))
         f.write(';\n\n')
 
-        ubsum_no, buf = ubsum()
-        f.write(f'param UBSUM_NO := {ubsum_no};\n\n')
-        f.write('param UBSUM:\n')
-        f.write('1   2   3   4   5   6 :=\n')
-        f.write(buf)
+        write_table(f, "EBOUND", data["EBOUND"])
+        write_indexed(f, "TASKN", data["TASKN"])
+        write_indexed(f, "PAYROLLN", data["PAYROLLN"])
+        write_indexed(f, "EXPPAY", data["EXPPAY"])
+
+        f.write(f'param OFFDAY_NO := {len(data["OFFDAY"])};\n\n')
+        f.write('param OFFDAY :=\n')
+        f.write(dat_rows(enumerate(data["OFFDAY"], start=1)))
         f.write(';\n\n')
 
-        buf = links()
+        write_table(f, "XBDAY", data["XBDAY"])
+        write_table(f, "XBSUM", data["XBSUM"])
+        write_table(f, "UBDAY", data["UBDAY"])
+        write_table(f, "UBSUM", data["UBSUM"])
+
         f.write('set LINKS :=\n')
-        f.write(buf)
+        f.write(dat_rows(data["LINKS"]))
         f.write(';\n\n')
 
     return ampl_data_file
 
 
-
-def save_schedule(ampl):
+# Number of days to be investigated, i.e. the parameter DAY_NO of the model
+def day_no(data):
+    return int(max(
+        data["TASKN"]["TASKE"].to_numpy().max(initial=0),
+        data["PAYROLLN"]["PAYROLLE"].to_numpy().max(initial=0),
+    ))
+
+
+# One row per day of each range, without the off days and the days outside the window
+def expand_days(df, window, offday):
+    start = np.maximum(df["Start"].to_numpy(dtype=int), window[0])
+    length = np.maximum(np.minimum(df["End"].to_numpy(dtype=int), window[1]) - start + 1, 0)
+    rep = np.repeat(np.arange(df.shape[0]), length)
+    offset = np.arange(length.sum()) - np.repeat(np.cumsum(length) - length, length)
+    days = df.iloc[rep].reset_index(drop=True).assign(Day=np.repeat(start, length) + offset)
+    return days[~days["Day"].isin(offday)].reset_index(drop=True)
+
+
+# The index space of X, i.e. the set XIDX of the model:
+# days within the linked tasks and the window, without weekends and holidays,
+# and only the allowed cells if there are any
+def xidx(data):
+    window_start, window_end = data.get("WINDOW", (1, day_no(data)))
+    links = pd.DataFrame(data["LINKS"], columns=["Expert", "Task"])
+    task = data["TASKN"].reindex(links["Task"])
+    start = np.maximum(task["TASKS"].to_numpy(dtype=int), window_start)
+    length = np.maximum(np.minimum(task["TASKE"].to_numpy(dtype=int), window_end) - start + 1, 0)
+
+    # Repeat each link for all days of its task
+    rep = np.repeat(np.arange(links.shape[0]), length)
+    offset = np.arange(length.sum()) - np.repeat(np.cumsum(length) - length, length)
+
+    df = pd.DataFrame({
+        "Expert": links["Expert"].to_numpy()[rep],
+        "Day": np.repeat(start, length) + offset,
+        "Task": links["Task"].to_numpy()[rep],
+    })
+    df = df[~df["Day"].isin(data["OFFDAY"])]
+    if "CELLS" in data:
+        df = df.merge(data["CELLS"], on=["Expert", "Day", "Task"])
+    return df.reset_index(drop=True)
+
+
+# The index space of U, i.e. the set UIDX of the model:
+# the cells of the frame x counted by the ubday and ubsum constraints.
+# The rows of x are returned with their index.
+def uidx(data, x):
+    cells = x[["Expert", "Day", "Task"]].reset_index()
+    by_day = cells.merge(data["UBDAY"][["Expert", "Start", "End"]], on="Expert")
+    by_day = by_day[(by_day["Start"] <= by_day["Day"]) & (by_day["Day"] <= by_day["End"])]
+    by_range = cells.merge(data["UBSUM"][["Expert", "Task", "Start", "End"]], on=["Expert", "Task"])
+    by_range = by_range[(by_range["Start"] <= by_range["Day"]) & (by_range["Day"] <= by_range["End"])]
+    return x.loc[np.union1d(by_day["index"], by_range["index"])]
+
+
+# Hours of the previous schedules which are still valid in the new index space.
+# The previous schedules are dense frames (tasks x dates), as saved by save_schedule.
+def initial_values(previous, data):
+    today = glb.today()
+    frames = []
+    for key, df in previous.items():
+        hours = df.stack()
+        hours = hours[hours > 0]
+        frames.append(pd.DataFrame({
+            "Expert": key.removeprefix("schedule "),
+            "Day": (hours.index.get_level_values(1) - today).days,
+            "Task": hours.index.get_level_values(0),
+            "X": np.rint(hours.to_numpy(dtype=float) * data["UNITS_PER_HOUR"]),
+        }))
+
+    if not frames:
+        return pd.DataFrame(columns=["Expert", "Day", "Task", "X"])
+
+    x = pd.concat(frames).merge(xidx(data), on=["Expert", "Day", "Task"])
+    x["X"] = x["X"].clip(upper=data["HOURS_PER_DAY"])
+    return x
+
+
+# Initial values of X and U passed to the solver as the MIP start
+def warm_start(ampl, x):
+    if x.empty:
+        return
+    index = list(zip(x["Expert"], x["Day"].tolist(), x["Task"]))
+    ampl.get_variable("X").set_values(dict(zip(index, x["X"].tolist())))
+    ampl.eval("let {(e, d, t) in UIDX} U[e, d, t] := if X[e, d, t] > 0 then 1 else 0;")
+
+
+# Pivot the sparse hours (Expert, Day, Task, X) into the dense schedule of each expert
+def schedule_frames(x, day_no, units):
     today = glb.today()
     tasks_name = glb.data["tasks"]["Name"]
     experts_name = glb.data["experts"]["Name"]
 
+    days = romz_calendar.dates(glb.data["calendar"], today + pd.Timedelta(days=1), today + pd.Timedelta(days=day_no))
+
+    e = pd.Index(experts_name).get_indexer(x["Expert"])
+    t = pd.Index(tasks_name).get_indexer(x["Task"])
+    d = x["Day"].to_numpy(dtype=int) - 1
+
+    cube = np.zeros((experts_name.size, tasks_name.size, day_no), dtype=np.float16)
+    cube[e, t, d] = x["X"].to_numpy()
+    cube /= units
+
+    return {
+        f"schedule {en}": pd.DataFrame(cube[ii], index=tasks_name.to_numpy(), columns=days)
+        for ii, en in enumerate(experts_name)
+    }
+
+
+# The nonzero hours of the solution, fetched in one call, and the number of days
+def solution(ampl):
     day_no = int(ampl.get_data("DAY_NO").to_pandas().iloc[0, 0])
-    days = pd.date_range(start=today + pd.Timedelta(days=1), periods=day_no, freq='D')
+    x = pd.DataFrame(
+        ampl.get_data("{(e, d, t) in XIDX: X[e, d, t] > 0} X[e, d, t]").to_list(),
+        columns=["Expert", "Day", "Task", "X"],
+    )
+    return x, day_no
+
+
+def save_schedule(x, day_no, units):
+    glb.data.update(schedule_frames(x, day_no, units))
+
 
-    for en in experts_name:
-        schedule = {
-            tn: ampl.get_data(f"{{d in 1..DAY_NO}} X['{en}', d, '{tn}']").to_pandas().iloc[:, 0]
-            for tn in tasks_name
+def save_day_no(day_no):
+    glb.data["DAY_NO"] = day_no
+
+
+def save(x, day_no, units):
+    save_schedule(x, day_no, units)
+    save_day_no(day_no)
+
+
+# Groups of experts and tasks connected by the links.
+# No constraint couples two different groups, so each group is a separate problem.
+# Experts and tasks without any link have no cell to schedule and belong to no group
+# (romz_check rejects the work of a task without linked experts).
+def components(data):
+    parent = {}
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for e, t in data["LINKS"]:
+        parent.setdefault(("e", e), ("e", e))
+        parent.setdefault(("t", t), ("t", t))
+        parent[find(("e", e))] = find(("t", t))
+
+    groups = {}
+    for node in parent:
+        groups.setdefault(find(node), []).append(node)
+
+    return [
+        ({name for kind, name in nodes if kind == "e"}, {name for kind, name in nodes if kind == "t"})
+        for nodes in groups.values()
+    ]
+
+
+# The data of the problem restricted to one group of experts and tasks
+def subproblem(data, experts, tasks):
+    def rows(df, experts_col="Expert", tasks_col=None):
+        mask = df[experts_col].isin(experts)
+        if tasks_col is not None:
+            mask &= df[tasks_col].isin(tasks)
+        return df[mask]
+
+    # The horizon of the group may end before the horizon of the whole problem
+    return cut_to_horizon({
+        "UNITS_PER_HOUR": data["UNITS_PER_HOUR"],
+        "HOURS_PER_DAY": data["HOURS_PER_DAY"],
+        "EXPERTN": [e for e in data["EXPERTN"] if e in experts],
+        "EBOUND": rows(data["EBOUND"]),
+        "TASKN": data["TASKN"][data["TASKN"].index.isin(tasks)],
+        "PAYROLLN": data["PAYROLLN"],
+        "EXPPAY": data["EXPPAY"][data["EXPPAY"].index.get_level_values(0).isin(experts)],
+        "OFFDAY": data["OFFDAY"],
+        "XBDAY": rows(data["XBDAY"], tasks_col="Task"),
+        "XBSUM": rows(data["XBSUM"], tasks_col="Task"),
+        "UBDAY": rows(data["UBDAY"]),
+        "UBSUM": rows(data["UBSUM"], tasks_col="Task"),
+        "LINKS": [(e, t) for e, t in data["LINKS"] if e in experts],
+    })
+
+
+# The off days and the ranges of the bounds cut to the DAY_NO of the data,
+# as the model requires them within 1..DAY_NO
+def cut_to_horizon(data):
+    last = day_no(data)
+
+    def within(df):
+        df = df[df["Start"] <= last]
+        return df.assign(End=np.minimum(df["End"].to_numpy(), last))
+
+    part = dict(data, OFFDAY=[d for d in data["OFFDAY"] if d <= last])
+    for name in ["EBOUND", "XBDAY", "XBSUM", "UBDAY", "UBSUM"]:
+        part[name] = within(data[name])
+    return part
+
+
+# Collects the AMPL output and streams it to the log queue, if there is one
+class Output(OutputHandler):
+    def __init__(self, log):
+        self.log = log
+        self.messages = []
+
+    def output(self, kind, msg):
+        self.messages.append(msg)
+        if self.log is not None:
+            self.log.put(msg)
+
+
+# Solve one problem in AMPL. It does not touch glb.data, so it can run in a worker process.
+# amplpy cannot interrupt a running solve, so with a cancel event AMPL runs in its own
+# process, which is stopped together with the solver as soon as the event is set.
+def run(data, x0, settings):
+    if settings["cancel"] is None:
+        return run_instance(data, x0, settings)
+
+    entrant = (settings["solver"], run_instance, (data, x0, dict(settings, cancel=None)))
+    winner, results, times = romz_pool.race([entrant], lambda r: True, settings["cancel"])
+    if winner is None:
+        return {"output": "", "solve_result": "cancelled" if cancelled(settings) else "failure", "x": None, "day_no": 0,
+                "gap": None, "times": {}}
+    if isinstance(results[winner], Exception):
+        raise results[winner]
+    return results[winner]
+
+
+# Solve one problem in a warm AMPL instance of this process
+def run_instance(data, x0, settings):
+    times = {}
+    start = time.perf_counter()
+    with romz_pool.instance() as ampl:
+        # A new instance reads the model, a warm one is ready at once
+        times["AMPL instance"] = time.perf_counter() - start
+        solver = settings["solver"]
+        ampl.set_option("solver", solver)
+
+        # Set solver-specific options
+        solver_options = {
+            "highs": "outlev=1",
+            "gcg": "tech:outlev-native=4",
+            "scip": "tech:outlev-native=5",
         }
-        # Create DataFrame from fetched data
-        df = pd.DataFrame(schedule, dtype=np.float16).T
-        df.columns = days
-        glb.data[f"schedule {en}"] = df / quarters_in_hour
+
+        options = [solver_options.get(solver, "")] + budget_options(settings["budget"])
+        ampl.option[f"{solver}_options"] = " ".join(o for o in options if o)
+
+        # The solver files of the job stay in its workspace
+        if settings["workspace"] is not None:
+            ampl.option["TMPDIR"] = settings["workspace"]
+
+        # The LP relaxation: X and U are continuous
+        if settings["relax"]:
+            ampl.option["relax_integrality"] = 1
+
+        with phase(times, "load data"):
+            load_data(ampl, data)
+            warm_start(ampl, x0)
+
+        output = Output(settings["log"])
+        ampl.set_output_handler(output)
+        with phase(times, "solve"):
+            ampl.eval("solve;")
+
+        # The solve command generates the instance first, then runs the solver
+        times["instance generation"] = max(0, times["solve"] - ampl.get_value("_solve_elapsed_time"))
+        times["solve"] -= times["instance generation"]
+
+        result = "cancelled" if cancelled(settings) else ampl.solve_result
+        with phase(times, "extraction"):
+            x, day_no = solution(ampl) if incumbent(ampl, result) else (None, 0)
+            gap = mip_gap(ampl) if x is not None else None
+            statistics = instance_statistics(ampl, data)
+
+    return {"output": "".join(output.messages), "solve_result": result, "x": x, "day_no": day_no, "gap": gap, "times": times,
+            "statistics": statistics}
+
+
+# The nonzeros of each constraint family, counted on the index frames of the model
+# in the same way as the matrix of romz_highs, i.e. before the presolve of AMPL.
+# C_CD_minimization has TASKDEV besides the cells of each link, and C_xbday one cell per row.
+def family_nonzeros(data):
+    x, columns, blocks = romz_highs.model(data)
+    nonzeros = {b["name"]: b["rows"].size for b in blocks}
+    nonzeros["C_CD_minimization"] = x.shape[0] + len(data["LINKS"])
+    nonzeros["C_xbday"] = romz_highs.xbday_cells(data, x).shape[0]
+    return nonzeros
+
+
+# The size of the instance generated by AMPL: the variables and the rows of each family,
+# the nonzeros of each family, and the nonzeros seen by the solver after the presolve.
+def instance_statistics(ampl, data):
+    nonzeros = family_nonzeros(data)
+    return {
+        "variables": {name: v.num_instances() for name, v in ampl.get_variables()},
+        "constraints": {name: (c.num_instances(), nonzeros.get(name)) for name, c in ampl.get_constraints()},
+        "nonzeros": int(ampl.get_value("_snzcons")),
+    }
 
 
-def save_day_no(ampl):
-    glb.data["DAY_NO"] = ampl.get_parameter("DAY_NO").to_pandas().astype(int).iat[0,0]
+# The solve budget: time limit in seconds, relative MIP gap and node limit.
+# The default time limit grows with the number of cells of the schedule:
+# half a minute plus one second per thousand cells, but at most ten minutes.
+def budget(data):
+    cells = xidx(data).shape[0]
+    return {
+        "time": float(glb.misc("Time limit", min(600, 30 + cells / 1000))),
+        "gap": float(glb.misc("MIP gap", 1e-4)),
+        "nodes": int(glb.misc("Node limit", 0)),
+    }
 
 
-def save(ampl):
-    save_schedule(ampl)
-    save_day_no(ampl)
+# The budget as the options of the AMPL solver drivers. No node limit if it is zero.
+def budget_options(budget):
+    options = [f"lim:time={budget['time']}", f"mip:gap={budget['gap']}", "mip:return_gap=1"]
+    if budget["nodes"]:
+        options.append(f"lim:nodes={budget['nodes']}")
+    return options
 
 
-# activate AMPL license
-def set_ampl_license():
-    uuid = os.environ.get("AMPLKEY_UUID")
-    if uuid is not None:
-        modules.activate(uuid)
+# The solution exists if the problem is solved, or if a limit is hit after an incumbent is found.
+# The AMPL solver drivers return solve_result_num 400..449 in the latter case.
+def incumbent(ampl, result):
+    return result == "solved" or (result == "limit" and ampl.get_value("solve_result_num") < 450)
 
 
-def solve(name):
-    file = data_file(name)
+# The relative MIP gap returned by the solver driver, if any
+def mip_gap(ampl):
+    try:
+        return float(ampl.get_value("objective_function.relmipgap"))
+    except Exception:
+        return None
 
-    set_ampl_license()
-    ampl = AMPL()
-    solver = glb.data["misc"].iloc[0]["Solver"]
-    ampl.set_option("solver", solver)
 
-    # Set solver-specific options
-    solver_options = {
-        "highs": "outlev=1",
-        "gcg": "tech:outlev-native=4",
-        "scip": "tech:outlev-native=5",
+def cancelled(settings):
+    return settings["cancel"] is not None and settings["cancel"].is_set()
+
+
+# The sum of hours (or the number of working days if count is True)
+# already scheduled within the range of each row of the bounds table.
+def used(x, df, keys, start, end, count=False):
+    rows = df[keys + [start, end]].reset_index(drop=True).reset_index()
+    hits = rows.merge(x, on=keys)
+    hits = hits[(hits[start] <= hits["Day"]) & (hits["Day"] <= hits[end])]
+    values = (hits["X"] > 0) if count else hits["X"]
+    return np.rint(values.groupby(hits["index"]).sum().reindex(rows["index"], fill_value=0).to_numpy(dtype=float))
+
+
+# Lower and upper bounds reduced by what is already scheduled.
+# The lower bound is checked only in the window where the range ends.
+def remaining(lower, upper, done, range_end, window):
+    start, end = window
+    ends_here = (start <= range_end.to_numpy()) & (range_end.to_numpy() <= end)
+    lower = np.where(ends_here, np.maximum(lower.to_numpy() - done, 0), 0)
+    upper = np.maximum(upper.to_numpy() - done, 0)
+    return lower, upper
+
+
+# The work of each task required after the day end by the lower bounds
+# of the single days (XBDAY) and of the ranges (XBSUM) of each expert
+def reserve(data, x, end):
+    keys = ["Expert", "Task"]
+    xbday = expand_days(data["XBDAY"], (end + 1, day_no(data)), data["OFFDAY"])
+    days = xbday.groupby(keys)["Lower"].sum()
+
+    xbsum = data["XBSUM"]
+    ranges = (xbsum["Lower"] - used(x, xbsum, keys, "Start", "End")).clip(lower=0)
+    ranges = ranges[(xbsum["End"] > end).to_numpy()].groupby([xbsum[k] for k in keys]).sum()
+
+    both = pd.concat([days, ranges], axis=1).fillna(0).max(axis=1)
+    return both.groupby(level="Task").sum().reindex(data["TASKN"].index, fill_value=0).to_numpy(dtype=float)
+
+
+# The work of each task which the days after the day end can still take:
+# the hours per day of the cells of the task, or less if the XBDAY bounds allow less
+def capacity(data, end):
+    cells = xidx(dict(data, WINDOW=(end + 1, day_no(data))))
+    cells = cells.assign(Col=np.arange(cells.shape[0]))
+    xbday = romz_highs.xbday_cells(data, cells)
+    upper = np.full(cells.shape[0], float(data["HOURS_PER_DAY"]))
+    np.minimum.at(upper, xbday["Col"].to_numpy(), xbday["Upper"].to_numpy(dtype=float))
+    total = pd.Series(upper).groupby(cells["Task"].to_numpy()).sum()
+    return total.reindex(data["TASKN"].index, fill_value=0).to_numpy(dtype=float)
+
+
+# The data of the window start..end, when the hours x before the window are already scheduled
+def carry_over(data, x, start, end):
+    part = dict(data)
+    part["WINDOW"] = (start, end)
+
+    done = np.rint(x.groupby("Task")["X"].sum().reindex(data["TASKN"].index, fill_value=0).to_numpy(dtype=float))
+    work = np.maximum(data["TASKN"]["TASKW"].to_numpy() - done, 0)
+    part["TASKN"] = data["TASKN"].assign(
+        TASKW=work, TASKR=np.minimum(reserve(data, x, end), work), TASKU=np.minimum(capacity(data, end), work)
+    )
+
+    exppay = data["EXPPAY"].reset_index(names=["Expert", "Period"])
+    exppay = exppay.join(data["PAYROLLN"], on="Period")
+    done = used(x, exppay, ["Expert"], "PAYROLLS", "PAYROLLE")
+    lower, upper = remaining(exppay["PAYROLLBL"], exppay["PAYROLLBU"], done, exppay["PAYROLLE"], part["WINDOW"])
+    part["EXPPAY"] = data["EXPPAY"].assign(PAYROLLBL=lower, PAYROLLBU=upper)
+
+    for name, count in [("XBSUM", False), ("UBSUM", True)]:
+        df = data[name]
+        done = used(x, df, ["Expert", "Task"], "Start", "End", count)
+        lower, upper = remaining(df["Lower"], df["Upper"], done, df["End"], part["WINDOW"])
+        part[name] = df.assign(Lower=lower, Upper=upper)
+
+    return part
+
+
+# Rolling-horizon mode: the days are scheduled window by window.
+# Each window is solved exactly together with the next one (the look-ahead),
+# so that the deadlines coming soon are seen in time. Only the days of the window
+# are fixed, the rest of the work is carried over. Windows without any cell are skipped.
+# The windows do not see the deadlines beyond the look-ahead, so a window may fail
+# or work may be left over. Then the whole problem is solved at once.
+def rolling_horizon(data, x0, settings):
+    window = settings["window"]
+    last = day_no(data)
+    x = pd.DataFrame({"Expert": pd.Series(dtype=object), "Day": pd.Series(dtype=int), "Task": pd.Series(dtype=object),
+                      "X": pd.Series(dtype=float)})
+    outputs = []
+    results = []
+
+    for start in range(1, last + 1, window):
+        end = min(start + window - 1, last)
+        ahead = min(end + window, last)
+        part = carry_over(data, x, start, ahead)
+        if xidx(part).empty:
+            continue
+        results.append(run_granular(part, x0[(start <= x0["Day"]) & (x0["Day"] <= ahead)], settings))
+        outputs.append(f"=== DAYS {start}..{end} (LOOK-AHEAD TO {ahead}) ===\n{results[-1]['output']}")
+        if results[-1]["x"] is None:
+            break
+        x = pd.concat([x, results[-1]["x"][results[-1]["x"]["Day"] <= end]], ignore_index=True)
+
+    done = x.groupby("Task")["X"].sum().reindex(data["TASKN"].index, fill_value=0).to_numpy(dtype=float)
+    finished = bool(np.all(done >= data["TASKN"]["TASKW"].to_numpy() - 1e-6))
+    if results and results[-1]["x"] is not None and finished:
+        return {"output": "\n".join(outputs), "solve_result": worst(results), "x": x, "day_no": last,
+                "gap": widest(results), "times": total_times(results), "statistics": total_statistics(results),
+                "heuristic failure": heuristic_failed(results)}
+
+    if cancelled(settings):
+        return {"output": "\n".join(outputs), "solve_result": "cancelled", "x": None, "day_no": 0, "gap": None,
+                "times": total_times(results)}
+    results.append(run_granular(data, x0, settings))
+    outputs.append(f"=== THE WHOLE PROBLEM ===\n{results[-1]['output']}")
+    return dict(results[-1], output="\n".join(outputs), times=total_times(results), statistics=total_statistics(results),
+                **{"heuristic failure": heuristic_failed(results)})
+
+
+# Portfolio mode: the solvers race on the same problem, each in its own process.
+# An entrant is an AMPL solver, or an engine (highspy, greedy) which then runs on its own.
+# The first solved result wins and the other solvers are cancelled.
+def portfolio(data, x0, settings):
+    entrants = [
+        (solver, engines().get(solver.lower(), run_instance), (data, x0, dict(settings, solver=solver, cancel=None)))
+        for solver in settings["portfolio"]
+    ]
+    winner, results, times = romz_pool.race(
+        entrants, lambda r: isinstance(r, dict) and r["solve_result"] == "solved", settings["cancel"]
+    )
+
+    def status(solver):
+        if solver == winner:
+            return "won"
+        if solver not in results:
+            return "cancelled"
+        if isinstance(results[solver], Exception):
+            return f"error: {results[solver]}"
+        return results[solver]["solve_result"]
+
+    summary = "\n".join(f"{solver}: {times[solver]:.1f} s, {status(solver)}" for solver in settings["portfolio"])
+    if winner is None:
+        # The best incumbent of the solvers which hit a limit, if any
+        failed = [r for r in results.values() if isinstance(r, dict)]
+        failed.sort(key=lambda r: (r["x"] is None, r["gap"] if r["gap"] is not None else np.inf))
+        result = failed[0] if failed else {"output": "", "solve_result": "cancelled" if cancelled(settings) else "failure",
+                                           "x": None, "day_no": 0, "gap": None, "times": {}}
+        return dict(result, output=f"=== PORTFOLIO: NO WINNER ===\n{summary}\n{result['output']}")
+
+    result = results[winner]
+    return dict(result, output=f"=== PORTFOLIO: {winner} WON ===\n{summary}\n=== {winner} ===\n{result['output']}")
+
+
+# "limit" if any of the results hit a limit
+def worst(results):
+    return "limit" if any(r["solve_result"] == "limit" for r in results) else "solved"
+
+
+# The widest gap of the results, or None if no gap is known
+def widest(results):
+    gaps = [r["gap"] for r in results if r["gap"] is not None]
+    return max(gaps) if gaps else None
+
+
+# The engines by name. The ampl engine solves with the Solver of the settings.
+# romz_highs and romz_greedy import this module, so their functions are looked up on call.
+def engines():
+    return {
+        "ampl": run,
+        "highspy": romz_highs.run,
+        "greedy": romz_greedy.run,
     }
 
-    if solver in solver_options:
-        ampl.option[f"{solver}_options"] = solver_options[solver]
 
-    # Change directory to AMPL's working directory
-    ampl.cd(os.path.dirname(os.path.dirname(__file__)))
+# True if the greedy heuristic failed in any of the results and the exact model was solved instead
+def heuristic_failed(results):
+    return any(r.get("heuristic failure", False) for r in results)
+
+
+# Solve one problem with the engine chosen in the settings.
+# The greedy schedule may be the starting solution of the exact engines.
+# If the greedy heuristic fails, it says nothing about the problem,
+# so the exact model is solved by HiGHS instead.
+def run_engine(data, x0, settings):
+    engine = str(settings["engine"]).strip().lower()
+    if engine not in engines():
+        raise Exception(f"Unknown engine '{settings['engine']}'. Use one of: {', '.join(engines())}")
+
+    times = {}
+    if settings["greedy start"] and engine != "greedy":
+        with phase(times, "greedy start"):
+            x_greedy, short = romz_greedy.schedule(data)
+        if not short:
+            x0 = x_greedy
+
+    if settings["portfolio"]:
+        r = portfolio(data, x0, settings)
+    else:
+        r = engines()[engine](data, x0, settings)
+
+    if engine == "greedy" and r["x"] is None and not cancelled(settings):
+        exact = romz_highs.run(data, x0, settings)
+        output = f"=== GREEDY: HEURISTIC FAILURE ===\n{r['output']}=== HIGHSPY: THE EXACT MODEL ===\n{exact['output']}"
+        r = dict(exact, output=output, times=total_times([r, exact]), **{"heuristic failure": True})
+    return dict(r, times=total_times([{"times": times}, r]))
+
+
+# The same data in coarser units, e.g. whole hours instead of quarters.
+# The factor is the ratio of the coarse and the fine units. The work is rounded,
+# the lower bounds are rounded down and the upper bounds up.
+def coarsen(data, factor):
+    hours_per_day = max(1, int(np.floor(data["HOURS_PER_DAY"] * factor)))
+
+    def bounds(df, lower, upper, daily=False):
+        high = np.ceil(df[upper].to_numpy(dtype=float) * factor)
+        return df.assign(**{
+            lower: np.floor(df[lower].to_numpy(dtype=float) * factor),
+            upper: np.minimum(high, hours_per_day) if daily else high,
+        })
+
+    part = dict(data)
+    part["UNITS_PER_HOUR"] = data["UNITS_PER_HOUR"] * factor
+    part["HOURS_PER_DAY"] = hours_per_day
+    part["TASKN"] = data["TASKN"].assign(TASKW=np.rint(data["TASKN"]["TASKW"].to_numpy(dtype=float) * factor))
+    if "TASKR" in data["TASKN"].columns:
+        part["TASKN"]["TASKR"] = np.minimum(np.floor(data["TASKN"]["TASKR"].to_numpy(dtype=float) * factor), part["TASKN"]["TASKW"])
+    if "TASKU" in data["TASKN"].columns:
+        part["TASKN"]["TASKU"] = np.minimum(np.ceil(data["TASKN"]["TASKU"].to_numpy(dtype=float) * factor), part["TASKN"]["TASKW"])
+    part["EBOUND"] = bounds(data["EBOUND"], "Lower", "Upper", daily=True)
+    part["EXPPAY"] = bounds(data["EXPPAY"], "PAYROLLBL", "PAYROLLBU")
+    part["XBDAY"] = bounds(data["XBDAY"], "Lower", "Upper", daily=True)
+    part["XBSUM"] = bounds(data["XBSUM"], "Lower", "Upper")
+    return part
+
+
+# The cells within the given number of days from the scheduled cells of x,
+# and the cells with a lower bound, which must stay in the schedule.
+# Only the cells of the index space are kept, so no day is outside 1..DAY_NO.
+def neighbourhood(data, x, days):
+    offsets = np.arange(-days, days + 1)
+    cells = pd.DataFrame({
+        "Expert": np.repeat(x["Expert"].to_numpy(), offsets.size),
+        "Day": np.repeat(x["Day"].to_numpy(dtype=int), offsets.size) + np.tile(offsets, x.shape[0]),
+        "Task": np.repeat(x["Task"].to_numpy(), offsets.size),
+    })
+    xbday = data["XBDAY"]
+    forced = expand_days(xbday[xbday["Lower"] > 0], (1, day_no(data)), data["OFFDAY"])[["Expert", "Day", "Task"]]
+    cells = pd.concat([cells, forced]).drop_duplicates()
+    return cells.merge(xidx(data), on=["Expert", "Day", "Task"]).reset_index(drop=True)
+
+
+# Coarse-to-fine mode: the problem is solved in coarse units first, e.g. whole hours.
+# Then it is solved in the fine units only near the coarse schedule, starting from it.
+# If either step fails, the whole problem is solved in the fine units.
+def coarse_to_fine(data, x0, settings):
+    factor = settings["coarse"] / data["UNITS_PER_HOUR"]
+    coarse = coarsen(data, factor)
+    x0_coarse = x0.assign(X=np.minimum(np.rint(x0["X"].to_numpy(dtype=float) * factor), coarse["HOURS_PER_DAY"]))
+
+    runs = [run_engine(coarse, x0_coarse, settings)]
+    outputs = [f"=== COARSE: {settings['coarse']:g} UNITS PER HOUR ===\n{runs[-1]['output']}"]
+
+    if runs[-1]["x"] is not None:
+        x1 = runs[-1]["x"].assign(X=np.rint(runs[-1]["x"]["X"].to_numpy(dtype=float) / factor))
+        part = dict(data, CELLS=neighbourhood(data, x1, settings["neighbourhood"]))
+        runs.append(run_engine(part, x1, settings))
+        outputs.append(f"=== FINE: {settings['neighbourhood']} DAYS AROUND THE COARSE SCHEDULE ===\n{runs[-1]['output']}")
+        x0 = x1
+
+    if runs[-1]["x"] is None and not cancelled(settings):
+        runs.append(run_engine(data, x0, settings))
+        outputs.append(f"=== FINE: THE WHOLE PROBLEM ===\n{runs[-1]['output']}")
+
+    return dict(runs[-1], output="\n".join(outputs), times=total_times(runs), statistics=total_statistics(runs),
+                **{"heuristic failure": heuristic_failed(runs)})
+
+
+# Solve one problem, directly or coarse-to-fine if the coarse units are given
+def run_granular(data, x0, settings):
+    if settings["coarse"]:
+        return coarse_to_fine(data, x0, settings)
+    return run_engine(data, x0, settings)
+
+
+# Solve the problem at once, or window by window if the window length is given
+def solve_problem(data, x0, settings):
+    if settings["window"]:
+        return rolling_horizon(data, x0, settings)
+    return run_granular(data, x0, settings)
+
+
+# Round the hours of the LP relaxation to whole quarters.
+# The total work of each task is kept and the hours per day are not exceeded:
+# the quarters missing after rounding down go to the cells with the largest fractions,
+# and if those are full, to the earliest free days of the task.
+def round_schedule(x, data):
+    hours_per_day = data["HOURS_PER_DAY"]
+    floor = np.floor(x["X"].to_numpy(dtype=float) + 1e-6)
+    x = x.assign(X=floor, Fraction=x["X"].to_numpy(dtype=float) - floor)
+
+    quarters = dict(zip(zip(x["Expert"], x["Day"], x["Task"]), x["X"]))
+    load = x.groupby(["Expert", "Day"])["X"].sum().to_dict()
+    done = x.groupby("Task")["X"].sum().reindex(data["TASKN"].index, fill_value=0)
+    missing = (data["TASKN"]["TASKW"] - done).clip(lower=0).astype(int).to_dict()
+
+    # Add at most "step" quarters to each cell, while the task misses some work
+    def add(cells, step):
+        for e, d, t in cells:
+            q = min(step, missing[t], hours_per_day - load.get((e, d), 0))
+            if q > 0:
+                quarters[(e, d, t)] = quarters.get((e, d, t), 0) + q
+                load[(e, d)] = load.get((e, d), 0) + q
+                missing[t] -= q
+
+    ranked = x[x["Fraction"] > 1e-6].sort_values("Fraction", ascending=False)
+    add(zip(ranked["Expert"], ranked["Day"], ranked["Task"]), 1)
+
+    if any(q > 0 for q in missing.values()):
+        cells = xidx(data)
+        add(zip(cells["Expert"], cells["Day"], cells["Task"]), hours_per_day)
+
+    return pd.DataFrame(
+        [(e, d, t, q) for (e, d, t), q in quarters.items() if q > 0],
+        columns=["Expert", "Day", "Task", "X"],
+    )
 
-    ampl.read("./res/ampl_mathematical_model.mod.py")
-    ampl.read_data(file)
+
+# The sizes of the solved instances as the tables of the variables and the constraints.
+# The nonzeros column is left out if the engine does not count the nonzeros of each family.
+def save_statistics(statistics):
+    for key in ["model variables", "model constraints", "model nonzeros"]:
+        glb.data.pop(key, None)
+    if statistics is None:
+        return
+    glb.data["model variables"] = pd.DataFrame(list(statistics["variables"].items()), columns=["Variable", "Count"])
+    constraints = pd.DataFrame(
+        [(name, rows, nonzeros) for name, (rows, nonzeros) in statistics["constraints"].items()],
+        columns=["Constraint", "Rows", "Nonzeros"],
+    )
+    glb.data["model constraints"] = constraints.dropna(axis=1, how="all")
+    glb.data["model nonzeros"] = statistics["nonzeros"]
+
+
+# The settings of the solve from the misc sheet
+def solve_settings(data, preview):
+    return {
+        "engine": glb.misc("Engine", "ampl"),
+        "solver": glb.data["misc"].iloc[0]["Solver"],
+        "window": int(glb.misc("Rolling horizon", 0)),
+        "relax": preview,
+        "greedy start": bool(glb.misc("Greedy start", False)),
+        "portfolio": [solver.strip() for solver in str(glb.misc("Portfolio", "")).split(",") if solver.strip()],
+        "budget": budget(data),
+        "coarse": coarse_units(),
+        "neighbourhood": int(glb.misc("Neighbourhood", 2)),
+    }
+
+
+# Solve the problem of glb.data and save the schedule there.
+# The solver output is streamed to the log queue and the solve stops
+# when the cancel event is set, if they are given.
+# The AMPL data file and the solver files are written to the workspace directory, if it is given.
+def solve(name, preview=False, log=None, cancel=None, workspace=None):
+    times = {"parse": glb.data["parse time"]}
+    with phase(times, "translate"):
+        data = translate()
+
+    # The AMPL data file is not needed for solving, it is written for debugging only
+    if glb.misc("Data file", False):
+        with phase(times, "data file"):
+            data_file(name, data, workspace)
+
+    settings = solve_settings(data, preview)
+
+    # The same workbook solved with the same settings, in any session
+    key = ("schedule", glb.data["workbook digest"], sorted(settings.items()))
+    with phase(times, "cache lookup"):
+        cached = romz_cache.get(key)
+    if cached is not None:
+        glb.data.update(cached)
+        glb.data["solve times"] = times
+        return
+
+    settings.update(log=log, cancel=cancel, workspace=workspace)
+
+    # Start from the previous schedule, if the input has only slightly changed
+    x0 = initial_values(glb.data.get("previous schedule", {}), data)
+    glb.data["warm start"] = x0.shape[0]
+
+    # Independent groups of experts and tasks are solved in parallel
+    groups = components(data) if glb.misc("Decompose", True) else []
+    if len(groups) > 1:
+        parts = [subproblem(data, experts, tasks) for experts, tasks in groups]
+        starts = [x0[x0["Expert"].isin(experts)] for experts, tasks in groups]
+        results = list(romz_pool.processes().map(
+            solve_problem, parts, starts, itertools.repeat(settings)
+        ))
+    else:
+        results = [solve_problem(data, x0, settings)]
 
     # Capture solver output and timestamp
-    glb.data["solver output"] = ampl.get_output("solve;")
+    if len(results) == 1:
+        glb.data["solver output"] = results[0]["output"]
+    else:
+        glb.data["solver output"] = "\n".join(
+            f"=== PROBLEM {ii} of {len(results)}: {len(groups[ii - 1][0])} experts, {len(groups[ii - 1][1])} tasks ===\n{r['output']}"
+            for ii, r in enumerate(results, start=1)
+        )
     glb.data["solver timestamp"] = datetime.datetime.now().strftime("%d %B %Y, %H:%M:%S %p")
 
     # Check if solving was successful
-    if ampl.solve_result != "solved":
-        raise Exception(f"Failed to solve AMPL problem. AMPL returned flag: {ampl.solve_result}")
-
-    save(ampl)
-
+    # The best incumbent is accepted when a limit is hit
+    for r in results:
+        if r["x"] is None:
+            raise Exception(f"Failed to solve the problem. The solver returned flag: {r['solve_result']}")
+    glb.data["solve result"] = worst(results)
+    glb.data["solver gap"] = widest(results)
+    glb.data["heuristic failure"] = heuristic_failed(results)
+
+    x = pd.concat([r["x"] for r in results])
+    if preview:
+        with phase(times, "rounding"):
+            x = round_schedule(x, data)
+
+    times.update(total_times(results))
+    with phase(times, "save schedule"):
+        save(x, max(r["day_no"] for r in results), data["UNITS_PER_HOUR"])
+    glb.data["preview"] = preview
+
+    save_statistics(total_statistics(results))
+    glb.data["solve times"] = times
+
+    solved = ["DAY_NO", "preview", "solve result", "solver gap", "heuristic failure", "solver output", "solver timestamp",
+              "warm start", "solve times", "model variables", "model constraints", "model nonzeros"]
+    solved += [f"schedule {e}" for e in glb.data["experts"]["Name"]]
+
+    # A schedule which only hit a limit is not cached, so that the next upload solves it again
+    if glb.data["solve result"] == "solved":
+        romz_cache.put(key, {k: glb.data[k] for k in solved if k in glb.data})
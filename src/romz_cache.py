@@ -0,0 +1,86 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+#
+# Content-addressed cache on the local disk, shared by all sessions and processes.
+# The key is hashed, each entry is one pickle file named by the hash.
+# The last use of an entry is its modification time, so the least recently used
+# entries are evicted first when the cache is too large, and the entries
+# not used for too long are evicted anyway.
+#
+
+directory = os.environ.get("YUMBO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "yumbo-cache"))
+
+# The maximal size of the cache in megabytes. Zero disables the cache.
+max_size = float(os.environ.get("YUMBO_CACHE_MB", 512)) * 2**20
+
+# The maximal age of an unused entry in days
+max_age = float(os.environ.get("YUMBO_CACHE_DAYS", 7)) * 24 * 3600
+
+lock = threading.Lock()
+
+
+def digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else repr(part).encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def path(key):
+    return os.path.join(directory, f"{digest(*key)}.pkl")
+
+
+# The value stored under the key, or None
+def get(key):
+    if max_size <= 0:
+        return None
+    try:
+        with open(path(key), "rb") as f:
+            value = pickle.load(f)
+        os.utime(path(key))
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    return value
+
+
+def put(key, value):
+    if max_size <= 0:
+        return
+    os.makedirs(directory, exist_ok=True)
+
+    # Write to a temporary file first, so that other processes never read a partial entry
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path(key))
+    evict()
+
+
+# Remove the entries too old, then the least recently used ones above the size limit
+def evict():
+    with lock:
+        entries = []
+        for entry in os.scandir(directory):
+            if entry.name.endswith(".pkl"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        now = time.time()
+        size = sum(s for _, s, _ in entries)
+        for mtime, s, p in sorted(entries):
+            if now - mtime <= max_age and size <= max_size:
+                break
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+            size -= s
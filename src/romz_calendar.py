@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+#
+# The working-day calendar of the workbook, built once when the workbook is read
+# and kept in glb.data["calendar"]. It covers all the dates of the workbook:
+#   first: the first day; the days are numbered by their offsets from it;
+#   dates: all the days, as the axis of the schedules and the charts;
+#   working: the business-day mask, without weekends and public holidays;
+#   cumulative: the number of working days before each day, so that the working days
+#               of any range are counted with two lookups.
+#
+
+def build(first, last, holidays):
+    first = np.datetime64(first, "D")
+    days = np.arange(first, np.datetime64(last, "D") + 1)
+    working = np.is_busday(days, holidays=np.asarray(holidays, dtype="datetime64[D]"))
+    return {
+        "first": first,
+        "dates": pd.DatetimeIndex(days),
+        "working": working,
+        "cumulative": np.concatenate([[0], np.cumsum(working)]),
+    }
+
+
+# The offsets of the dates from the first day of the calendar
+def offset(calendar, dates):
+    return (np.asarray(dates, dtype="datetime64[D]") - calendar["first"]).astype(int)
+
+
+# The number of working days from start to end, both inclusive; zero if end is before start
+def workdays(calendar, start, end):
+    n = calendar["working"].size
+    i = np.clip(offset(calendar, start), 0, n)
+    j = np.clip(offset(calendar, end) + 1, 0, n)
+    return np.maximum(calendar["cumulative"][j] - calendar["cumulative"][i], 0)
+
+
+def is_working(calendar, dates):
+    return calendar["working"][offset(calendar, dates)]
+
+
+# All the days from start to end, both inclusive
+def dates(calendar, start, end):
+    i = max(int(offset(calendar, start)), 0)
+    j = max(int(offset(calendar, end)) + 1, i)
+    return calendar["dates"][i:j]
+
+
+# The calendar extended to the last day, if it ends earlier
+def extend(calendar, last, holidays):
+    if np.datetime64(last, "D") <= calendar["dates"][-1].to_datetime64():
+        return calendar
+    return build(calendar["first"], last, holidays)
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+import romz_calendar
+import glb
+
+#
+# Pre-solve analysis of the workbook. Each check returns the rows of the tables
+# which make the problem impossible, so an infeasible workbook is rejected
+# in milliseconds, before the model is built.
+# Passing all the checks does not guarantee that the problem is feasible.
+#
+
+# Sheets referring to experts, tasks and invoicing periods by name
+references = [
+    ("links", "Expert", "experts"),
+    ("links", "Task", "tasks"),
+    ("xbday", "Expert", "experts"),
+    ("xbday", "Task", "tasks"),
+    ("xbsum", "Expert", "experts"),
+    ("xbsum", "Task", "tasks"),
+    ("ubday", "Expert", "experts"),
+    ("ubsum", "Expert", "experts"),
+    ("ubsum", "Task", "tasks"),
+    ("expert bounds", "Expert", "experts"),
+    ("invoicing periods bounds", "Expert", "experts"),
+    ("invoicing periods bounds", "Period", "invoicing periods"),
+]
+
+# Sheets with the Start and End dates
+ranges = ["tasks", "xbday", "xbsum", "ubday", "ubsum", "expert bounds", "invoicing periods"]
+
+# Sheets with the Lower and Upper bounds
+bounds = ["xbday", "xbsum", "ubday", "ubsum", "expert bounds", "invoicing periods bounds"]
+
+# Sheets with the bounds of the hours of one day
+daily = ["xbday", "expert bounds"]
+
+
+def check_references():
+    for sheet, col, target in references:
+        df = glb.data[sheet]
+        yield f"{sheet}: {col} not defined in the sheet {target}", df[~df[col].isin(glb.data[target]["Name"])]
+
+
+def check_ranges():
+    for sheet in ranges:
+        df = glb.data[sheet]
+        yield f"{sheet}: End before Start (or before tomorrow)", df[df["End"] < df["Start"]]
+
+
+def check_bounds():
+    for sheet in bounds:
+        df = glb.data[sheet]
+        yield f"{sheet}: Lower greater than Upper", df[df["Lower"] > df["Upper"]]
+
+    for sheet in daily:
+        df = glb.data[sheet]
+        yield f"{sheet}: Lower greater than Hours per day", df[df["Lower"] > glb.hours_per_day()]
+
+
+# The working days of each range which can still be scheduled, from tomorrow on
+def remaining_workdays(df):
+    return romz_calendar.workdays(glb.data["calendar"], df["Start"].clip(lower=glb.tomorrow()), df["End"])
+
+
+# The tasks whose work exceeds the working hours of all the linked experts
+def check_tasks():
+    tasks = glb.data["tasks"]
+    experts = glb.data["links"].groupby("Task")["Expert"].nunique()
+    df = tasks.assign(Experts=experts.reindex(tasks["Name"], fill_value=0).to_numpy())
+    df = df.assign(Capacity=remaining_workdays(df) * df["Experts"] * glb.hours_per_day())
+    yield "tasks: Work greater than the working hours of the linked experts", df[df["Work"] > df["Capacity"]]
+
+
+# The lower bounds of the sums which exceed the working hours of their ranges
+def check_sums():
+    periods = glb.data["invoicing periods"]
+    periods = pd.Series(remaining_workdays(periods), index=periods["Name"].to_numpy())
+    df = glb.data["invoicing periods bounds"]
+    df = df.assign(Capacity=periods.reindex(df["Period"]).to_numpy() * glb.hours_per_day())
+    yield "invoicing periods bounds: Lower greater than the working hours of the period", df[df["Lower"] > df["Capacity"]]
+
+    df = glb.data["xbsum"]
+    df = df.assign(Capacity=remaining_workdays(df) * glb.hours_per_day())
+    yield "xbsum: Lower greater than the working hours of the range", df[df["Lower"] > df["Capacity"]]
+
+    df = glb.data["ubsum"]
+    df = df.assign(Workdays=remaining_workdays(df))
+    yield "ubsum: Lower greater than the number of working days of the range", df[df["Lower"] > df["Workdays"]]
+
+    links = pd.MultiIndex.from_frame(glb.data["links"][["Expert", "Task"]])
+    for sheet in ["xbday", "xbsum", "ubsum"]:
+        df = glb.data[sheet]
+        unlinked = ~pd.MultiIndex.from_frame(df[["Expert", "Task"]]).isin(links)
+        yield f"{sheet}: Lower greater than zero for the expert not linked with the task", df[unlinked & (df["Lower"] > 0)]
+
+
+# One row per working day of each range, within the range of the task if there is one
+def working_days(df):
+    start = df["Start"].to_numpy(dtype="datetime64[D]")
+    end = df["End"].to_numpy(dtype="datetime64[D]")
+    if "Task" in df.columns:
+        tasks = glb.data["tasks"].set_index("Name").reindex(df["Task"])
+        start = np.maximum(start, tasks["Start"].to_numpy(dtype="datetime64[D]"))
+        end = np.minimum(end, tasks["End"].to_numpy(dtype="datetime64[D]"))
+
+    length = np.maximum((end - start).astype(int) + 1, 0)
+    rep = np.repeat(np.arange(df.shape[0]), length)
+    offset = np.arange(length.sum()) - np.repeat(np.cumsum(length) - length, length)
+    days = start[rep] + offset.astype("timedelta64[D]")
+
+    working = romz_calendar.is_working(glb.data["calendar"], days)
+    return df.iloc[rep[working]].reset_index(drop=True).assign(Day=days[working])
+
+
+# The days on which the lower bounds of the expert's tasks exceed the hours available
+def check_days():
+    keys = ["Expert", "Day"]
+    lower = working_days(glb.data["xbday"]).groupby(keys)["Lower"].sum()
+    upper = working_days(glb.data["expert bounds"]).groupby(keys)["Upper"].min()
+    df = pd.concat([lower, upper], axis=1).dropna(subset=["Lower"]).reset_index()
+    df["Upper"] = df["Upper"].astype(float).fillna(glb.hours_per_day()).clip(upper=glb.hours_per_day())
+    yield "xbday: sum of Lower over the tasks of the expert greater than the hours available on the day", df[df["Lower"] > df["Upper"]]
+
+
+# All the problems found in the workbook, as pairs (description, offending rows)
+def analyse():
+    checks = [check_references, check_ranges, check_bounds, check_tasks, check_sums, check_days]
+    return [(description, rows) for check in checks for description, rows in check() if not rows.empty]
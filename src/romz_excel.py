@@ -1,5 +1,6 @@
 import numpy as np
 import pandas as pd
+import romz_calendar
 import romz_datetime
 import glb
 
@@ -16,18 +17,8 @@ def add_days_and_workdays(df, start, end):
     # Calculate total days (inclusive)
     df["Days"] = (df[end] - df[start]).dt.days + 1
 
-    # Define dtype for datetime conversion
-    dtype = "datetime64[D]"
-
-    # Convert public holidays to numpy datetime64[D]
-    holidays = glb.data["public holidays"]["Date"].to_numpy(dtype=dtype)
-
-    # Calculate workdays using numpy's busday_count
-    df["Workdays"] = np.busday_count(
-        df[start].to_numpy(dtype=dtype),
-        (df[end] + pd.Timedelta(days=1)).to_numpy(dtype=dtype),
-        holidays=holidays
-    )
+    # Count the workdays with the calendar of the workbook
+    df["Workdays"] = romz_calendar.workdays(glb.data["calendar"], df[start], df[end])
 
     return df
 
@@ -35,15 +26,12 @@ def add_days_and_workdays(df, start, end):
 def read_tasks(xlsx):
     df = xlsx.parse(sheet_name="tasks", usecols="A:D")
     df = parse_date_columns(df, ["Start", "End"])
-    df = add_days_and_workdays(df, "Start", "End")
-    df["Avg"] = df["Work"] / df["Workdays"]
     glb.data["tasks"] = df
 
 
 def read_invoicing_periods(xlsx):
     df = xlsx.parse(sheet_name="invoicing periods", usecols="A:C")
     df = parse_date_columns(df, ["Start", "End"])
-    df = add_days_and_workdays(df, "Start", "End")
     glb.data["invoicing periods"] =  df
 
 
@@ -88,7 +76,7 @@ def read_public_holidays(xlsx):
 
 
 def read_misc(xlsx):
-    df = xlsx.parse(sheet_name="misc", usecols="A:C")
+    df = xlsx.parse(sheet_name="misc")
     glb.data["misc"] = df
 
 
@@ -135,6 +123,23 @@ def read_invoicing_periods_bounds(xlsx):
                                                       dtype={"Lower": np.float16, "Upper": np.float16})
 
 
+# The calendar covering today and all the ranges of the workbook
+def build_calendar():
+    dates = [glb.today()]
+    for df in (glb.data[name] for name in names if name != "calendar"):
+        if "Start" in df.columns and "End" in df.columns:
+            dates += [df["Start"].min(), df["End"].max()]
+    dates = pd.Series(dates).dropna()
+    holidays = glb.data["public holidays"]["Date"].to_numpy(dtype="datetime64[D]")
+    glb.data["calendar"] = romz_calendar.build(dates.min(), dates.max(), holidays)
+
+
+def add_workdays():
+    df = add_days_and_workdays(glb.data["tasks"], "Start", "End")
+    df["Avg"] = df["Work"] / df["Workdays"]
+    add_days_and_workdays(glb.data["invoicing periods"], "Start", "End")
+
+
 def adjust_start_days():
     # List of DataFrame keys and the column to update
     targets = [
@@ -156,6 +161,18 @@ def adjust_start_days():
         glb.data[key].loc[glb.data[key][col] < tomorrow, col] = tomorrow
 
 
+# The tables of glb.data read from the workbook, and the calendar
+names = [
+    "public holidays", "misc", "tasks", "xbday", "xbsum", "ubday", "ubsum",
+    "invoicing periods", "experts", "expert bounds", "invoicing periods bounds", "links",
+    "himg", "timg", "simg", "gimg", "wimg", "bimg", "calendar",
+]
+
+
+def tables():
+    return {name: glb.data[name] for name in names}
+
+
 def read(file_path):
     xlsx = pd.ExcelFile(file_path)
     read_public_holidays(xlsx)
@@ -176,5 +193,7 @@ def read(file_path):
     read_gimg(xlsx)
     read_wimg(xlsx)
     read_bimg(xlsx)
+    build_calendar()
+    add_workdays()
     adjust_start_days()
 
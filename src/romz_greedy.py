@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import romz_ampl
+import romz_highs
+
+#
+# Greedy constructive scheduler. No solver is needed, the schedule is ready at once.
+# The rows of the model are taken from romz_highs, so the schedule is built
+# and checked against exactly the constraints of the mathematical model.
+#
+# The hours are placed in this order:
+#   (1) the lower bounds of the single cells (xbday);
+#   (2) the lower bounds of the rows (invoicing periods, xbsum, expert bounds, ubday, ubsum);
+#   (3) the rest of the work of the tasks, earliest deadline first, earliest day first.
+# The upper bounds are never exceeded. The lower bounds are met if possible.
+#
+
+# Rows summing X: the hours
+x_rows = ["C_payroll", "C_hours_per_day", "C_xbsum", "C_ebound"]
+
+# Rows summing U: the number of cells used
+u_rows = ["C_ubday", "C_ubsum"]
+
+
+def schedule(data):
+    x, columns, blocks = romz_highs.model(data)
+    n = x.shape[0]
+    blocks = [b for b in blocks if b["name"] in x_rows + u_rows]
+    a, lower, upper = romz_highs.matrix(columns, blocks)
+    by_col = a.tocsc()
+    names = np.repeat([b["name"] for b in blocks], [b["row_no"] for b in blocks])
+
+    tasks = data["TASKN"]
+    task = pd.Index(tasks.index).get_indexer(x["Task"])
+    work = tasks["TASKW"].to_numpy(dtype=float)
+    rest = columns["cost"].size - tasks.shape[0]
+    most = work - columns["lower"][rest:]
+    least = work - columns["upper"][rest:]
+
+    # The column of U of each cell (-1 if none) and the cell of each column
+    ucol = x["UCol"].to_numpy()
+    with_u = ucol >= 0
+    cell = np.full(columns["cost"].size, -1)
+    cell[:n] = np.arange(n)
+    cell[ucol[with_u]] = np.flatnonzero(with_u)
+
+    values = np.zeros(n)
+    load = np.zeros(a.shape[0])
+    done = np.zeros(tasks.shape[0])
+
+    def rows(col):
+        return by_col.indices[by_col.indptr[col]:by_col.indptr[col + 1]]
+
+    # Add at most q quarters to the cell col. Returns the number of quarters added.
+    def add(col, q):
+        t = task[col]
+        q = min(q, columns["upper"][col] - values[col], most[t] - done[t])
+        r = rows(col)
+        if r.size:
+            q = min(q, (upper[r] - load[r]).min())
+        if q <= 0:
+            return 0
+        if values[col] == 0 and with_u[col]:
+            ru = rows(ucol[col])
+            if ru.size and (upper[ru] - load[ru]).min() < 1:
+                return 0
+            load[ru] += 1
+        values[col] += q
+        load[r] += q
+        done[t] += q
+        return q
+
+    # Columns of the row, earliest day first
+    def cells(row):
+        cols = cell[a.indices[a.indptr[row]:a.indptr[row + 1]]]
+        return cols[np.argsort(x["Day"].to_numpy()[cols], kind="stable")]
+
+    for col in np.flatnonzero(columns["lower"][:n] > 0):
+        add(col, columns["lower"][col])
+
+    for row in np.flatnonzero(lower > 0):
+        for col in cells(row):
+            if load[row] >= lower[row]:
+                break
+            if names[row] in x_rows:
+                add(col, lower[row] - load[row])
+            elif values[col] == 0:
+                add(col, 1)
+
+    deadline = tasks["TASKE"].to_numpy()[task]
+    release = tasks["TASKS"].to_numpy()[task]
+    for col in np.lexsort((x["Day"].to_numpy(), release, deadline)):
+        if done[task[col]] < most[task[col]]:
+            add(col, np.inf)
+
+    # Check the lower bounds, which may be missed
+    used = np.zeros(columns["cost"].size)
+    used[:n] = values
+    used[ucol[with_u]] = values[with_u] > 0
+    short = np.unique(names[a @ used < lower]).tolist()
+    if np.any(values < columns["lower"][:n]):
+        short.append("C_xbday")
+    if np.any(done < least):
+        short.append("C_task_work")
+
+    solution = x.loc[values > 0, ["Expert", "Day", "Task"]].assign(X=values[values > 0]).reset_index(drop=True)
+    return solution, short
+
+
+# Build the schedule greedily. Returns the same result as romz_ampl.run.
+def run(data, x0, settings):
+    times = {}
+    with romz_ampl.phase(times, "greedy"):
+        solution, short = schedule(data)
+
+    output = f"Greedy schedule: {solution.shape[0]} cells, {int(solution['X'].sum())} units of time.\n"
+    if short:
+        output += f"Lower bounds not met: {', '.join(short)}.\n"
+        return {"output": output, "solve_result": "failure", "x": None, "day_no": 0, "gap": None, "times": times}
+
+    return {"output": output, "solve_result": "solved", "x": solution, "day_no": romz_ampl.day_no(data), "gap": None, "times": times}
@@ -0,0 +1,288 @@
+import highspy
+import numpy as np
+import pandas as pd
+import scipy.sparse
+import romz_ampl
+
+#
+# The mathematical model of res/ampl_mathematical_model.mod.py assembled directly
+# as a sparse matrix and solved by HiGHS through highspy, without AMPL.
+#
+# The columns are X[e, d, t] over XIDX, U[e, d, t] over UIDX, followed by TASKREST[t].
+# The column of U of each cell of X is in the column UCol of the index frame (-1 if none).
+# TASKDEV[e, t] is not needed: at the optimum it is equal to the weighted sum
+# of X[e, d, t], so the weights go directly to the costs of X.
+#
+
+inf = highspy.kHighsInf
+
+
+# Pairs (row, column) of the cells within the range of each row of the bounds table
+def cells_in(rows, cells, on, start=None, end=None):
+    df = rows.reset_index(drop=True).reset_index(names="Row").merge(cells, on=on)
+    if start is not None:
+        df = df[(df[start] <= df["Day"]) & (df["Day"] <= df[end])]
+    return df["Row"].to_numpy(), df["Col"].to_numpy()
+
+
+def block(name, row_no, rows, cols, values, lower, upper):
+    return {
+        "name": name,
+        "row_no": row_no,
+        "rows": np.asarray(rows, dtype=np.int64),
+        "cols": np.asarray(cols, dtype=np.int64),
+        "values": np.broadcast_to(np.asarray(values, dtype=float), np.shape(rows)),
+        "lower": np.broadcast_to(np.asarray(lower, dtype=float), (row_no,)),
+        "upper": np.broadcast_to(np.asarray(upper, dtype=float), (row_no,)),
+    }
+
+
+def c_task_work(data, x, rest):
+    tasks = data["TASKN"]
+    t = pd.Index(tasks.index).get_indexer(x["Task"])
+    rows = np.concatenate([t, np.arange(tasks.shape[0])])
+    cols = np.concatenate([x["Col"].to_numpy(), rest])
+    work = tasks["TASKW"].to_numpy(dtype=float)
+    return block("C_task_work", tasks.shape[0], rows, cols, 1, work, work)
+
+
+def c_hours_per_day(data, x):
+    rows = x.groupby(["Expert", "Day"], sort=False).ngroup().to_numpy()
+    return block("C_hours_per_day", rows.max(initial=-1) + 1, rows, x["Col"], 1, 0, data["HOURS_PER_DAY"])
+
+
+def c_payroll(data, x):
+    exppay = data["EXPPAY"].reset_index(names=["Expert", "Period"]).join(data["PAYROLLN"], on="Period")
+    rows, cols = cells_in(exppay, x, ["Expert"], "PAYROLLS", "PAYROLLE")
+    return block("C_payroll", exppay.shape[0], rows, cols, 1, exppay["PAYROLLBL"], exppay["PAYROLLBU"])
+
+
+def c_xbsum(data, x):
+    df = data["XBSUM"]
+    rows, cols = cells_in(df, x, ["Expert", "Task"], "Start", "End")
+    return block("C_xbsum", df.shape[0], rows, cols, 1, df["Lower"], df["Upper"])
+
+
+def c_ebound(data, x, window):
+    df = romz_ampl.expand_days(data["EBOUND"], window, data["OFFDAY"])
+    rows, cols = cells_in(df, x, ["Expert", "Day"])
+    return block("C_ebound", df.shape[0], rows, cols, 1, df["Lower"], df["Upper"])
+
+
+def c_use_lower(u):
+    m = u.shape[0]
+    rows = np.concatenate([np.arange(m), np.arange(m)])
+    cols = np.concatenate([u["Col"].to_numpy(), u["XCol"].to_numpy()])
+    values = np.concatenate([np.ones(m), -np.ones(m)])
+    return block("C_use_lower", m, rows, cols, values, -inf, 0)
+
+
+def c_use_upper(data, u):
+    m = u.shape[0]
+    rows = np.concatenate([np.arange(m), np.arange(m)])
+    cols = np.concatenate([u["Col"].to_numpy(), u["XCol"].to_numpy()])
+    values = np.concatenate([np.full(m, float(data["HOURS_PER_DAY"])), -np.ones(m)])
+    return block("C_use_upper", m, rows, cols, values, 0, inf)
+
+
+def c_ubday(data, u, window):
+    df = romz_ampl.expand_days(data["UBDAY"], window, data["OFFDAY"])
+    rows, cols = cells_in(df, u, ["Expert", "Day"])
+    return block("C_ubday", df.shape[0], rows, cols, 1, df["Lower"], df["Upper"])
+
+
+def c_ubsum(data, u):
+    df = data["UBSUM"]
+    rows, cols = cells_in(df, u, ["Expert", "Task"], "Start", "End")
+    return block("C_ubsum", df.shape[0], rows, cols, 1, df["Lower"], df["Upper"])
+
+
+# The cells of x within the ranges of the single-day bounds XBDAY, one row per pair (bound, cell)
+def xbday_cells(data, x):
+    df = data["XBDAY"].merge(x, on=["Expert", "Task"])
+    return df[(df["Start"] <= df["Day"]) & (df["Day"] <= df["End"])]
+
+
+# The whole model: the columns and the blocks of rows
+def model(data):
+    window = data.get("WINDOW", (1, romz_ampl.day_no(data)))
+    tasks = data["TASKN"]
+    hours_per_day = float(data["HOURS_PER_DAY"])
+
+    x = romz_ampl.xidx(data)
+    n = x.shape[0]
+    x["Col"] = np.arange(n)
+    u = romz_ampl.uidx(data, x)
+    m = u.shape[0]
+    u = u.assign(XCol=u["Col"], Col=np.arange(n, n + m))
+    x["UCol"] = -1
+    x.loc[u.index, "UCol"] = u["Col"]
+    rest = np.arange(n + m, n + m + tasks.shape[0])
+
+    # C_CD_minimization: the work done later costs more
+    start = tasks["TASKS"].reindex(x["Task"]).to_numpy(dtype=float)
+    x_cost = np.cbrt(x["Day"].to_numpy(dtype=float) - start)
+    rest_cost = np.cbrt(np.maximum(1, window[1] + 1 - tasks["TASKS"].to_numpy(dtype=float)))
+    rest_cost *= 1 + 1 / np.maximum(1, tasks["TASKE"].to_numpy(dtype=float) - window[1])
+
+    x_upper = np.full(n, hours_per_day)
+    x_lower = np.zeros(n)
+
+    # C_xbday are the bounds of single cells
+    xbday = xbday_cells(data, x)
+    np.maximum.at(x_lower, xbday["Col"].to_numpy(), xbday["Lower"].to_numpy(dtype=float))
+    np.minimum.at(x_upper, xbday["Col"].to_numpy(), xbday["Upper"].to_numpy(dtype=float))
+
+    rest_lower = tasks.get("TASKR", pd.Series(0, index=tasks.index)).to_numpy(dtype=float)
+    rest_upper = tasks.get("TASKU", tasks["TASKW"]).to_numpy(dtype=float)
+    rest_upper = np.where(tasks["TASKE"].to_numpy() <= window[1], 0, rest_upper)
+
+    columns = {
+        "cost": np.concatenate([x_cost, np.zeros(m), rest_cost]),
+        "lower": np.concatenate([x_lower, np.zeros(m), rest_lower]),
+        "upper": np.concatenate([x_upper, np.ones(m), rest_upper]),
+        "integer": np.concatenate([np.ones(n + m, dtype=bool), np.zeros(tasks.shape[0], dtype=bool)]),
+    }
+
+    blocks = [
+        c_payroll(data, x),
+        c_task_work(data, x, rest),
+        c_hours_per_day(data, x),
+        c_xbsum(data, x),
+        c_ebound(data, x, window),
+        c_use_lower(u),
+        c_use_upper(data, u),
+        c_ubday(data, u, window),
+        c_ubsum(data, u),
+    ]
+    return x, columns, blocks
+
+
+# The blocks stacked into one CSR matrix
+def matrix(columns, blocks):
+    offsets = np.cumsum([0] + [b["row_no"] for b in blocks])
+    rows = np.concatenate([b["rows"] + offset for b, offset in zip(blocks, offsets)])
+    cols = np.concatenate([b["cols"] for b in blocks])
+    values = np.concatenate([b["values"] for b in blocks])
+    shape = (offsets[-1], columns["cost"].size)
+    a = scipy.sparse.csr_matrix((values, (rows, cols)), shape=shape)
+    lower = np.concatenate([b["lower"] for b in blocks])
+    upper = np.concatenate([b["upper"] for b in blocks])
+    return a, lower, upper
+
+
+def highs_lp(columns, blocks, relax):
+    a, lower, upper = matrix(columns, blocks)
+
+    lp = highspy.HighsLp()
+    lp.num_col_ = a.shape[1]
+    lp.num_row_ = a.shape[0]
+    lp.col_cost_ = columns["cost"]
+    lp.col_lower_ = columns["lower"]
+    lp.col_upper_ = columns["upper"]
+    lp.row_lower_ = lower
+    lp.row_upper_ = upper
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+    lp.a_matrix_.num_col_ = a.shape[1]
+    lp.a_matrix_.num_row_ = a.shape[0]
+    lp.a_matrix_.start_ = a.indptr
+    lp.a_matrix_.index_ = a.indices
+    lp.a_matrix_.value_ = a.data
+    if not relax:
+        lp.integrality_ = [
+            highspy.HighsVarType.kInteger if integer else highspy.HighsVarType.kContinuous
+            for integer in columns["integer"]
+        ]
+    return lp
+
+
+# HiGHS model status translated to the AMPL solve_result
+def solve_result(status):
+    results = {
+        highspy.HighsModelStatus.kOptimal: "solved",
+        highspy.HighsModelStatus.kInfeasible: "infeasible",
+        highspy.HighsModelStatus.kUnbounded: "unbounded",
+        highspy.HighsModelStatus.kUnboundedOrInfeasible: "infeasible",
+        highspy.HighsModelStatus.kTimeLimit: "limit",
+        highspy.HighsModelStatus.kIterationLimit: "limit",
+        highspy.HighsModelStatus.kSolutionLimit: "limit",
+        highspy.HighsModelStatus.kInterrupt: "limit",
+    }
+    return results.get(status, "failure")
+
+
+# The initial values of X and U as the MIP start. Only the cells of the previous schedule
+# are given, as a partial solution, and HiGHS completes the rest of it.
+def warm_start(h, x, x0):
+    if x0.empty:
+        return
+    start = x0.merge(x, on=["Expert", "Day", "Task"])
+    ucol = start["UCol"].to_numpy()
+    used = ucol >= 0
+    index = np.concatenate([start["Col"].to_numpy(), ucol[used]]).astype(np.int32)
+    value = np.concatenate([start["X"].to_numpy(dtype=float), np.ones(used.sum())])
+    h.setSolution(index.size, index, value)
+
+
+# Solve one problem with HiGHS. Returns the same result as romz_ampl.run.
+def run(data, x0, settings):
+    times = {}
+    with romz_ampl.phase(times, "build matrix"):
+        x, columns, blocks = model(data)
+        lp = highs_lp(columns, blocks, settings["relax"])
+
+    h = highspy.Highs()
+    log = []
+    h.setOptionValue("log_to_console", False)
+
+    def logging(event):
+        log.append(event.message)
+        if settings["log"] is not None:
+            settings["log"].put(event.message)
+
+    def interrupt(event):
+        if romz_ampl.cancelled(settings):
+            event.data_out.user_interrupt = True
+
+    h.cbLogging += logging
+    h.cbSimplexInterrupt += interrupt
+    h.cbIpmInterrupt += interrupt
+    h.cbMipInterrupt += interrupt
+
+    h.setOptionValue("time_limit", settings["budget"]["time"])
+    h.setOptionValue("mip_rel_gap", settings["budget"]["gap"])
+    if settings["budget"]["nodes"]:
+        h.setOptionValue("mip_max_nodes", settings["budget"]["nodes"])
+
+    with romz_ampl.phase(times, "load data"):
+        h.passModel(lp)
+        warm_start(h, x, x0)
+    with romz_ampl.phase(times, "solve"):
+        h.run()
+
+    result = "cancelled" if romz_ampl.cancelled(settings) else solve_result(h.getModelStatus())
+    output = "".join(log)
+    info = h.getInfo()
+    feasible = info.primal_solution_status == highspy.SolutionStatus.kSolutionStatusFeasible
+    if not (result == "solved" or (result == "limit" and feasible)):
+        return {"output": output, "solve_result": result, "x": None, "day_no": 0, "gap": None, "times": times}
+
+    with romz_ampl.phase(times, "extraction"):
+        values = np.asarray(h.getSolution().col_value)[:x.shape[0]]
+        nonzero = values > 0
+        solution = x.loc[nonzero, ["Expert", "Day", "Task"]].assign(X=values[nonzero]).reset_index(drop=True)
+    gap = None if settings["relax"] else info.mip_gap
+    return {"output": output, "solve_result": result, "x": solution, "day_no": romz_ampl.day_no(data), "gap": gap,
+            "times": times, "statistics": statistics(data, x, columns, blocks)}
+
+
+# The size of the matrix passed to HiGHS: the variables, and the rows and nonzeros of each block.
+# TASKDEV, C_CD_minimization and C_xbday of the AMPL model are not in the matrix.
+def statistics(data, x, columns, blocks):
+    n = x.shape[0]
+    tasks = data["TASKN"].shape[0]
+    return {
+        "variables": {"X": n, "U": columns["cost"].size - n - tasks, "TASKREST": tasks},
+        "constraints": {b["name"]: (b["row_no"], b["rows"].size) for b in blocks},
+        "nonzeros": sum(b["rows"].size for b in blocks),
+    }
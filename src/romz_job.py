@@ -0,0 +1,71 @@
+import queue
+import shutil
+import tempfile
+import threading
+import romz_ampl
+import romz_pool
+import glb
+
+#
+# The solve running in the background, one per session.
+# The page keeps responding while it runs: the solver log is streamed
+# through a queue and the solve stops as soon as it is cancelled.
+# The queue and the event are shared with the worker processes.
+# Each job has its own temporary workspace for the AMPL data file and the solver files,
+# so the jobs of different sessions never write into the same files.
+#
+
+def start(name, preview):
+    manager = romz_pool.manager()
+    job = {
+        "log": manager.Queue(),
+        "cancel": manager.Event(),
+        "messages": [],
+        "error": None,
+        "workspace": tempfile.mkdtemp(prefix="yumbo-job-"),
+    }
+    session = glb.data.session()
+
+    def work():
+        # The thread works on the data of the session which started the job
+        glb.data.bind(session)
+        try:
+            romz_ampl.solve(name, preview, job["log"], job["cancel"], job["workspace"])
+        except Exception as e:
+            job["error"] = e
+
+    job["thread"] = threading.Thread(target=work, daemon=True)
+    job["thread"].start()
+    return job
+
+
+def running(job):
+    return job is not None and job["thread"].is_alive()
+
+
+# Stop the solver and wait until the job is finished
+def cancel(job):
+    if running(job):
+        job["cancel"].set()
+        job["thread"].join()
+
+
+# Cancel the job and remove its workspace
+def close(job):
+    if job is not None:
+        cancel(job)
+        shutil.rmtree(job["workspace"], ignore_errors=True)
+
+
+def cancelled(job):
+    return job["cancel"].is_set()
+
+
+# The solver log received so far
+def log(job):
+    while True:
+        try:
+            job["messages"].append(job["log"].get_nowait())
+        except queue.Empty:
+            break
+    return "".join(job["messages"])
@@ -0,0 +1,200 @@
+import atexit
+import concurrent.futures
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from amplpy import AMPL, modules
+
+#
+# Process-wide pool of warm AMPL instances.
+# The license is activated once and each instance reads the model once.
+# Between the jobs only the data is reset.
+#
+# The pool serves the solves which cannot be cancelled: the batch runner, the benchmark
+# and the what-if scenarios. amplpy cannot interrupt a running solve, so a solve with
+# a cancel event, i.e. every solve started from the application, runs AMPL in a fresh
+# process instead (see romz_ampl.run) and pays for starting AMPL and reading the model.
+#
+
+# The maximal number of AMPL instances working at the same time
+size = int(os.environ.get("YUMBO_AMPL_INSTANCES", 2))
+
+idle = queue.LifoQueue()
+slots = threading.BoundedSemaphore(size)
+license_lock = threading.Lock()
+license_activated = False
+
+
+# activate AMPL license
+def set_ampl_license():
+    global license_activated
+    with license_lock:
+        if not license_activated:
+            uuid = os.environ.get("AMPLKEY_UUID")
+            if uuid is not None:
+                modules.activate(uuid)
+            license_activated = True
+
+
+def create():
+    set_ampl_license()
+    ampl = AMPL()
+
+    # Change directory to AMPL's working directory
+    ampl.cd(os.path.dirname(os.path.dirname(__file__)))
+
+    ampl.read("./res/ampl_mathematical_model.mod.py")
+    return ampl
+
+
+# Make the instance ready for the next job, or drop it if AMPL is broken
+def give_back(ampl):
+    try:
+        ampl.eval("reset data;")
+        ampl.reset_options()
+    except Exception:
+        ampl.close()
+    else:
+        idle.put(ampl)
+
+
+# Check out a warm instance. Blocks while all instances are busy.
+@contextmanager
+def instance():
+    with slots:
+        try:
+            ampl = idle.get_nowait()
+        except queue.Empty:
+            ampl = create()
+        try:
+            yield ampl
+        finally:
+            give_back(ampl)
+
+
+#
+# Process-wide pool of worker processes for the problems solved in parallel.
+# The workers keep their own warm AMPL instances between the jobs.
+#
+
+# The number of worker processes, all the cores by default
+workers = os.cpu_count()
+
+executor = None
+executor_lock = threading.Lock()
+
+
+def processes():
+    global executor
+    with executor_lock:
+        if executor is None:
+            executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            atexit.register(executor.shutdown)
+    return executor
+
+
+#
+# Process-wide manager of the queues and events shared with the worker processes
+#
+
+shared = None
+
+
+def manager():
+    global shared
+    with executor_lock:
+        if shared is None:
+            shared = multiprocessing.get_context("spawn").Manager()
+            atexit.register(shared.shutdown)
+    return shared
+
+
+# Stop the worker processes and the manager. They are started again when needed.
+# A process which used them must call it before it exits, e.g. a worker of another pool,
+# whose exit does not wait for the handlers registered with atexit.
+def shutdown():
+    global executor, shared
+    with executor_lock:
+        if executor is not None:
+            executor.shutdown()
+            executor = None
+        if shared is not None:
+            shared.shutdown()
+            shared = None
+
+
+#
+# Races of the same job run by several entrants, each in its own process.
+# Each process leads its own process group, so that cancelling it
+# also stops AMPL and the solver started by it.
+#
+
+def race_worker(results, name, fn, args):
+    if hasattr(os, "setsid"):
+        os.setsid()
+    try:
+        result = fn(*args)
+    except Exception as e:
+        result = e
+    results.put((name, result))
+
+
+def cancel(process):
+    if process.is_alive():
+        if hasattr(os, "killpg"):
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                # The process has not started its own group yet
+                process.terminate()
+        else:
+            process.terminate()
+    process.join()
+
+
+# Run fn(*args) of all the entrants (name, fn, args) in parallel.
+# The first result accepted by won() wins and the other entrants are cancelled.
+# All the entrants are cancelled as soon as the stop event is set, if it is given.
+# Returns the name of the winner (None if nobody won), the results received
+# and the running time of each entrant in seconds.
+def race(entrants, won, stop=None):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    start = time.monotonic()
+
+    running = {}
+    for name, fn, args in entrants:
+        running[name] = context.Process(target=race_worker, args=(results, name, fn, args))
+        running[name].start()
+
+    received = {}
+    times = {}
+    winner = None
+    try:
+        while winner is None and len(received) < len(running):
+            if stop is not None and stop.is_set():
+                break
+            try:
+                name, result = results.get(timeout=1)
+            except queue.Empty:
+                # An entrant died without any result
+                if not any(p.is_alive() for n, p in running.items() if n not in received):
+                    break
+                continue
+            times[name] = time.monotonic() - start
+            received[name] = result
+            if won(result):
+                winner = name
+    finally:
+        for name, process in running.items():
+            cancel(process)
+            times.setdefault(name, time.monotonic() - start)
+
+    return winner, received, times
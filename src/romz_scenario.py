@@ -0,0 +1,135 @@
+import itertools
+import numpy as np
+import pandas as pd
+import romz_ampl
+import romz_calendar
+import romz_pool
+import glb
+
+#
+# What-if scenarios. The workbook is translated once, then each scenario changes
+# the translated data and is solved in a worker process with a warm AMPL instance.
+# The results of all the scenarios are compared in one table.
+#
+# The scenarios are given as the table of changes, one change per row:
+#   Scenario: the name of the scenario; the rows with the same name make one scenario;
+#   Change: "hours per day", "deadline" or "absence";
+#   Name: the task of "deadline" or the expert of "absence";
+#   Value: the new hours per day, or the number of days the deadline slips by;
+#   Start, End: the dates of "absence".
+#
+
+columns = ["Scenario", "Change", "Name", "Value", "Start", "End"]
+
+
+def hours_per_day(data, change):
+    hours = int(round(float(change.Value) * data["UNITS_PER_HOUR"]))
+    part = dict(data, HOURS_PER_DAY=hours)
+
+    # The daily bounds cannot exceed the hours per day
+    for name in ["EBOUND", "XBDAY"]:
+        df = data[name]
+        part[name] = df.assign(Lower=np.minimum(df["Lower"], hours), Upper=np.minimum(df["Upper"], hours))
+    return part
+
+
+def deadline(data, change):
+    tasks = data["TASKN"].copy()
+    task = tasks.loc[change.Name]
+    tasks.loc[change.Name, "TASKE"] = max(task["TASKS"], task["TASKE"] + int(change.Value))
+
+    # The bounds of the days after the new deadline are dropped
+    end = tasks.loc[change.Name, "TASKE"]
+    xbday = data["XBDAY"]
+    task = (xbday["Task"] == change.Name).to_numpy()
+    xbday = xbday.assign(End=np.where(task, np.minimum(xbday["End"], end), xbday["End"]))
+    xbday = xbday[xbday["Start"] <= xbday["End"]].reset_index(drop=True)
+
+    # The days after the horizon of the workbook get their weekends and holidays,
+    # and the days dropped from the end of the horizon lose them
+    part = dict(data, TASKN=tasks, XBDAY=xbday, OFFDAY=data["OFFDAY"] + offday(romz_ampl.day_no(data), end))
+    return romz_ampl.cut_to_horizon(part)
+
+
+# Weekends and holidays of the days after first up to last, relative to today
+def offday(first, last):
+    if last <= first:
+        return []
+    today = glb.today()
+    holidays = glb.data["public holidays"]["Date"].to_numpy(dtype="datetime64[D]")
+    calendar = romz_calendar.extend(glb.data["calendar"], today + pd.Timedelta(days=last), holidays)
+    days = romz_calendar.dates(calendar, today + pd.Timedelta(days=first + 1), today + pd.Timedelta(days=last))
+    return (days[~romz_calendar.is_working(calendar, days)] - today).days.tolist()
+
+
+# The expert does not work from Start to End
+def absence(data, change):
+    today = glb.today()
+    start = max(1, (pd.Timestamp(change.Start) - today).days)
+    end = min(romz_ampl.day_no(data), (pd.Timestamp(change.End) - today).days)
+    if start > end:
+        return data
+
+    row = pd.DataFrame({"Expert": [change.Name], "Start": [start], "End": [end], "Lower": [0], "Upper": [0]})
+    return dict(data, EBOUND=pd.concat([data["EBOUND"], row], ignore_index=True))
+
+
+changes = {
+    "hours per day": hours_per_day,
+    "deadline": deadline,
+    "absence": absence,
+}
+
+
+# The data changed by all the rows of one scenario
+def apply(data, rows):
+    for change in rows.itertuples(index=False):
+        if change.Change not in changes:
+            raise Exception(f"Unknown change '{change.Change}' in the scenario '{change.Scenario}'")
+        if change.Change == "deadline" and change.Name not in data["TASKN"].index:
+            raise Exception(f"Unknown task '{change.Name}' in the scenario '{change.Scenario}'")
+        if change.Change == "absence" and change.Name not in data["EXPERTN"]:
+            raise Exception(f"Unknown expert '{change.Name}' in the scenario '{change.Scenario}'")
+        data = changes[change.Change](data, change)
+    return data
+
+
+# The objective function of the model for the schedule x
+def objective(data, x):
+    tasks = data["TASKN"]
+    start = tasks["TASKS"].reindex(x["Task"]).to_numpy(dtype=float)
+    cost = np.sum(np.cbrt(x["Day"].to_numpy(dtype=float) - start) * x["X"].to_numpy(dtype=float))
+
+    done = x.groupby("Task")["X"].sum().reindex(tasks.index, fill_value=0).to_numpy(dtype=float)
+    rest = np.maximum(tasks["TASKW"].to_numpy(dtype=float) - done, 0)
+    rest_cost = np.cbrt(np.maximum(1, romz_ampl.day_no(data) + 1 - tasks["TASKS"].to_numpy(dtype=float)))
+    return cost + np.sum(rest * rest_cost)
+
+
+# Solve the base data and all the scenarios in parallel.
+# Returns the comparison table: the result, the objective, the gap and the hours of each expert.
+def sweep(data, table, settings):
+    names = ["base"] + list(dict.fromkeys(table["Scenario"]))
+    variants = [data] + [apply(data, table[table["Scenario"] == name]) for name in names[1:]]
+
+    x0 = pd.DataFrame(columns=["Expert", "Day", "Task", "X"])
+    results = romz_pool.processes().map(
+        romz_ampl.solve_problem, variants, itertools.repeat(x0), itertools.repeat(settings)
+    )
+
+    rows = []
+    for name, variant, r in zip(names, variants, results):
+        row = {"Scenario": name, "Result": r["solve_result"], "Objective": np.nan, "Gap": r["gap"]}
+        if r["x"] is not None:
+            row["Objective"] = objective(variant, r["x"])
+            hours = r["x"].groupby("Expert")["X"].sum() / variant["UNITS_PER_HOUR"]
+            row.update({f"{e} [h]": hours.get(e, 0.0) for e in data["EXPERTN"]})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+# Solve the scenarios of the table for the workbook in glb.data
+def run(table):
+    data = romz_ampl.translate()
+    settings = dict(romz_ampl.solve_settings(data, False), log=None, cancel=None, workspace=None)
+    return sweep(data, table, settings)
@@ -93,6 +93,15 @@ def customise_date_range():
         )
 
 
+def customise_solver():
+    st.subheader("Solver", divider="blue")
+    glb.data["preview mode"] = st.checkbox(
+        "Fast preview first?",
+        value=False,
+        help="Show the rounded LP relaxation in seconds. The exact MILP is solved on request.",
+    )
+
+
 def customise_report():
     customise_report_layout()
     customise_show_experts()
@@ -170,6 +179,7 @@ def show(uploaded_file):
     st.caption(f"Tomorrow: :green[{glb.tomorrow().date()}]")
     st.caption(f"Last day: :green[{glb.last_day().date()}]")
 
+    customise_solver()
     customise_report()
     show_tasks()
     show_experts()
@@ -3,6 +3,7 @@ import io
 import matplotlib
 import numpy as np
 import pandas as pd
+import romz_calendar
 import romz_datetime
 import streamlit as st
 import time
@@ -17,7 +18,7 @@ def plot(expert_name):
     end = glb.simg("End")
 
     # Generate day labels and filter dataframe
-    days = pd.date_range(start=start, end=end, freq="D")
+    days = romz_calendar.dates(glb.data["calendar"], start, end)
     df = glb.data[f"schedule {expert_name}"][days]
 
     # Determine bar width
@@ -2,6 +2,7 @@ import glb
 import io
 import matplotlib
 import pandas as pd
+import romz_calendar
 import romz_datetime
 import streamlit as st
 import time
@@ -15,7 +16,7 @@ def plot_df(df):
     end = glb.timg("End")
 
     # Generate the date range as string
-    days = pd.date_range(start=start, end=end, freq="D")
+    days = romz_calendar.dates(glb.data["calendar"], start, end)
 
     # Count the number of tasks per day
     tasks_per_day = (df[days] > 0).sum()
@@ -3,6 +3,7 @@ import io
 import matplotlib
 import numpy as np
 import pandas as pd
+import romz_calendar
 import streamlit as st
 import time
 
@@ -33,9 +34,7 @@ def plot(expert_name):
     y = np.empty(bounds.shape[0], dtype=dtype)
     for idx, period in enumerate(bounds["Period"]):
         period_data = invper_dict[period]
-        start = pd.Timestamp(period_data["Start"])
-        end = pd.Timestamp(period_data["End"])
-        x_task = pd.date_range(start=start, end=end, freq="D").intersection(schedule.columns)
+        x_task = romz_calendar.dates(glb.data["calendar"], period_data["Start"], period_data["End"]).intersection(schedule.columns)
         y[idx] = schedule.loc[:, x_task].sum().sum()
 
     ylower = bounds["Lower"].to_numpy(dtype=dtype)
@@ -0,0 +1,112 @@
+import argparse
+import concurrent.futures
+import multiprocessing
+import os
+import sys
+import pandas as pd
+import romz_ampl
+import romz_check
+import romz_pool
+import glb
+
+#
+# Headless batch runner. Solves many workbooks without Streamlit, e.g. from cron:
+#
+#   python ./src/yumbo_batch.py -o ./out ./ampl-data-input-excel
+#
+# Each workbook gets its own directory in the output directory, with the schedule
+# of each expert as a CSV file and the solver log. The summary of all the workbooks
+# is written to summary.csv. The exit code is 1 if any workbook is not solved.
+#
+
+# The workbooks given as files, or found in the given directories
+def workbooks(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in sorted(os.walk(path)):
+                yield from (os.path.join(root, f) for f in sorted(files) if f.endswith(".xlsx") and not f.startswith("~$"))
+        else:
+            yield path
+
+
+# The cores are shared by the workbooks solved at the same time,
+# so that their parallel subproblems do not start jobs times cores processes
+def share_cores(jobs):
+    romz_pool.workers = max(1, os.cpu_count() // jobs)
+
+
+# Solve one workbook in a worker process and write its results.
+# The processes started for the workbook are stopped before the worker process is reused or exits.
+def solve_workbook(path, output):
+    try:
+        return solve_and_write(path, output)
+    finally:
+        romz_pool.shutdown()
+
+
+def solve_and_write(path, output):
+    name = os.path.splitext(os.path.basename(path))[0]
+    directory = os.path.join(output, name)
+    os.makedirs(directory, exist_ok=True)
+
+    glb.data.bind({})
+    with open(path, "rb") as f:
+        glb.load(f.read())
+
+    issues = romz_check.analyse()
+    if issues:
+        with open(os.path.join(directory, "issues.txt"), "w") as f:
+            for description, rows in issues:
+                f.write(f"{description}\n{rows.to_string(index=False)}\n\n")
+        return {"Workbook": path, "Result": "rejected", "Gap": None, "Message": f"{len(issues)} problems found"}
+
+    try:
+        romz_ampl.solve(name, workspace=directory)
+    except Exception as e:
+        result = {"Workbook": path, "Result": "failed", "Gap": None, "Message": str(e)}
+    else:
+        message = "greedy heuristic failed, solved by HiGHS" if glb.data.get("heuristic failure") else ""
+        result = {"Workbook": path, "Result": glb.data["solve result"], "Gap": glb.data["solver gap"], "Message": message}
+        for key, df in glb.data.items():
+            if key.startswith("schedule "):
+                df.to_csv(os.path.join(directory, f"{key}.csv"))
+
+    if "solver output" in glb.data:
+        with open(os.path.join(directory, "solver.log"), "w") as f:
+            f.write(glb.data["solver output"])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve Yumbo workbooks without the user interface.")
+    parser.add_argument("paths", nargs="+", help="workbooks (.xlsx) or directories with workbooks")
+    parser.add_argument("-o", "--output", default="./yumbo-output", help="output directory (default: ./yumbo-output)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="workbooks solved at the same time")
+    args = parser.parse_args()
+
+    paths = list(workbooks(args.paths))
+    os.makedirs(args.output, exist_ok=True)
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=args.jobs, mp_context=multiprocessing.get_context("spawn"),
+        initializer=share_cores, initargs=(args.jobs,),
+    ) as executor:
+        futures = {executor.submit(solve_workbook, path, args.output): path for path in paths}
+        results = []
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"Workbook": futures[future], "Result": "failed", "Gap": None, "Message": str(e)}
+            print(f"{result['Result']:>8}  {result['Workbook']}  {result['Message']}", flush=True)
+            results.append(result)
+
+    summary = pd.DataFrame(results, columns=["Workbook", "Result", "Gap", "Message"]).sort_values("Workbook")
+    summary.to_csv(os.path.join(args.output, "summary.csv"), index=False)
+
+    solved = summary["Result"].isin(["solved", "limit"])
+    return 0 if solved.all() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
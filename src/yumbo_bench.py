@@ -0,0 +1,225 @@
+import argparse
+import concurrent.futures
+import datetime
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+import romz_ampl
+import romz_cache
+import romz_check
+import glb
+from yumbo_batch import workbooks
+
+#
+# Benchmark of the whole pipeline on the sample workbooks:
+#
+#   python ./src/yumbo_bench.py --repeat 3 ./ampl-data-input-excel
+#
+# Each repetition of each workbook runs in a fresh process with the cache disabled,
+# so every stage is measured cold: parsing, translation, the AMPL data file,
+# the AMPL instance and loading, solving, saving the schedule and each chart.
+# The median time of each stage, the peak memory of the process together with AMPL
+# and the solvers, and the model size are written to the results file and compared
+# with the baseline; the stages slower than the baseline by more than the tolerance
+# are reported as regressions.
+#
+
+# The chart modules, as named by their time counters
+charts = ["bimg", "gimg", "himg", "simg", "timg", "wimg"]
+
+
+# The resident memory in kB of this process and all its descendants: AMPL, the solvers
+# and the worker processes. Read from /proc, so it is zero where there is no /proc.
+def tree_rss():
+    if not os.path.isdir("/proc"):
+        return 0
+    parents, rss = {}, {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        pid = int(entry)
+        parents[pid] = int(fields[1])
+        rss[pid] = int(fields[21]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+    tree = {os.getpid()}
+    found = True
+    while found:
+        found = False
+        for pid, parent in parents.items():
+            if parent in tree and pid not in tree:
+                tree.add(pid)
+                found = True
+    return sum(rss.get(pid, 0) for pid in tree)
+
+
+# The peak memory of the process tree while the block runs, sampled every 50 ms.
+# The peaks of this process and of the finished children are taken from getrusage,
+# as the samples may miss them.
+@contextmanager
+def peak_memory(result):
+    peak = [0]
+    finished = threading.Event()
+
+    def sample():
+        while True:
+            peak[0] = max(peak[0], tree_rss())
+            if finished.wait(0.05):
+                return
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        yield
+    finally:
+        finished.set()
+        sampler.join()
+        usage = max(resource.getrusage(who).ru_maxrss for who in [resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN])
+        result["peak rss [MB]"] = max(peak[0], usage) / 1024
+
+
+# Draw all the charts of the report for each expert, as the main panel does
+def draw_charts():
+    # The charts need Streamlit, which runs here without the server and shows nothing
+    import main_yumbo
+    import himg, simg, timg, wimg
+
+    main_yumbo.zero_time_counters()
+    for expert_name in glb.data["experts"]["Name"]:
+        main_yumbo.show_tasks_gantt_chart(expert_name)
+        timg.plot(expert_name)
+        himg.plot(expert_name)
+        simg.plot(expert_name)
+        wimg.plot(expert_name)
+        main_yumbo.show_commitment_per_task(expert_name)
+    return {name: glb.data[f"time:{name}:val"] for name in charts}
+
+
+# One cold run of the pipeline on the workbook, in a fresh worker process
+def run_once(path):
+    romz_cache.max_size = 0
+    name = os.path.basename(path)
+    memory = {}
+
+    with peak_memory(memory):
+        glb.data.bind({})
+        with open(path, "rb") as f:
+            glb.load(f.read())
+        if romz_check.analyse():
+            return {"result": "rejected", "times": {"parse": glb.data["parse time"]}}
+
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            romz_ampl.data_file(name, romz_ampl.translate(), directory)
+            data_file = time.perf_counter() - start
+
+        try:
+            romz_ampl.solve(name)
+        except Exception as e:
+            return {"result": "failed", "message": str(e), "times": {"parse": glb.data["parse time"]}}
+
+        times = dict(glb.data["solve times"], **{"data file": data_file})
+        times.update(draw_charts())
+
+    result = {"result": glb.data["solve result"], "times": times}
+    result.update(memory)
+    # The greedy engine builds no model
+    if "model variables" in glb.data:
+        result["variables"] = int(glb.data["model variables"]["Count"].sum())
+        result["constraints"] = int(glb.data["model constraints"]["Rows"].sum())
+        result["nonzeros"] = int(glb.data["model nonzeros"])
+    return result
+
+
+# The medians over the repetitions of one workbook
+def summarise(runs):
+    result = {"result": runs[-1]["result"], "runs": len(runs)}
+    stages = dict.fromkeys(stage for run in runs for stage in run["times"])
+    result["times"] = {stage: statistics.median(run["times"].get(stage, 0) for run in runs) for stage in stages}
+    for key in ["peak rss [MB]", "variables", "constraints", "nonzeros"]:
+        if key in runs[-1]:
+            result[key] = max(run[key] for run in runs)
+    return result
+
+
+# The differences from the baseline which exceed the tolerance.
+# Stage times shorter than min_time seconds are ignored, they are mostly noise.
+def regressions(results, baseline, tolerance, min_time):
+    for name, current in results["workbooks"].items():
+        base = baseline["workbooks"].get(name)
+        if base is None:
+            continue
+        if current["result"] != base["result"]:
+            yield name, "result", base["result"], current["result"]
+        for stage, value in current["times"].items():
+            old = base["times"].get(stage)
+            if old is not None and value > old * (1 + tolerance) and value - old > min_time:
+                yield name, f"{stage} [s]", old, value
+        for key in ["peak rss [MB]", "variables", "constraints", "nonzeros"]:
+            old = base.get(key)
+            if old is not None and current.get(key, 0) > old * (1 + tolerance):
+                yield name, key, old, current[key]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Yumbo pipeline on the sample workbooks.")
+    parser.add_argument("paths", nargs="*", default=["./ampl-data-input-excel"],
+                        help="workbooks (.xlsx) or directories with workbooks (default: ./ampl-data-input-excel)")
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="repetitions of each workbook (default: 3)")
+    parser.add_argument("-o", "--output", default="./benchmark-results.json", help="results file")
+    parser.add_argument("-b", "--baseline", default="./benchmark-baseline.json", help="baseline file")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown (default: 0.2)")
+    parser.add_argument("--min-time", type=float, default=0.05, help="stage times below it are not compared (default: 0.05 s)")
+    args = parser.parse_args()
+
+    results = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "repeat": args.repeat,
+        "workbooks": {},
+    }
+
+    # One run at a time, each in a new process, so that the runs do not disturb each other
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn"), max_tasks_per_child=1
+    ) as executor:
+        for path in workbooks(args.paths):
+            runs = [executor.submit(run_once, path).result() for _ in range(args.repeat)]
+            name = os.path.splitext(os.path.basename(path))[0]
+            results["workbooks"][name] = summary = summarise(runs)
+            total = sum(summary["times"].values())
+            print(f"{summary['result']:>8}  {total:8.3f} s  {name}", flush=True)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline {args.baseline}, run again with --save-baseline to store one.")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    found = list(regressions(results, baseline, args.tolerance, args.min_time))
+    for name, key, old, new in found:
+        print(f"REGRESSION  {name}  {key}: {old} -> {new}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+import argparse
+import datetime
+import sys
+import numpy as np
+import pandas as pd
+
+#
+# Synthetic workbooks for scaling experiments, larger than the samples:
+#
+#   python ./src/yumbo_synth.py -e 50 -t 500 -d 730 big.xlsx
+#
+# The generator first draws a hidden plan: the hours of every expert on every linked task
+# on every working day, in whole quarters of an hour and never above the hours per day.
+# The work of each task is the work of the plan, and every bound is drawn around the plan,
+# so the plan satisfies all of them and the workbook is always feasible.
+#
+
+HOURS_PER_DAY = 8
+UNITS_PER_HOUR = 4
+
+
+# The days of the horizon, starting tomorrow, and which of them are working days
+def calendar(rng, today, days, holidays):
+    dates = pd.date_range(today + pd.Timedelta(days=1), periods=days, freq="D")
+    weekdays = dates[dates.dayofweek < 5]
+    holidays = pd.DatetimeIndex(np.sort(rng.choice(weekdays, size=min(holidays, weekdays.size), replace=False)))
+    working = np.is_busday(dates.to_numpy(dtype="datetime64[D]"), holidays=holidays.to_numpy(dtype="datetime64[D]"))
+    return dates, working, holidays
+
+
+# Random sub-range [a, b] of the days [start, end]
+def subrange(rng, start, end):
+    a = rng.integers(start, end + 1)
+    return a, rng.integers(a, end + 1)
+
+
+# The hidden plan: for each expert, the units of each linked task (rows) on each day (columns)
+def plan(rng, link, start, end, working):
+    days = np.arange(working.size)
+    capacity = HOURS_PER_DAY * UNITS_PER_HOUR
+    result = []
+    for e in range(link.shape[0]):
+        tasks = np.flatnonzero(link[e])
+        active = (days >= start[tasks, None]) & (days <= end[tasks, None]) & working
+        weights = rng.random(active.shape) * active * (rng.random(active.shape) < 0.6)
+        total = weights.sum(axis=0)
+        share = np.divide(weights, total, out=np.zeros_like(weights), where=total > 0)
+        units = np.floor(share * np.floor(rng.uniform(0.5, 0.9, days.size) * capacity))
+        result.append(units.astype(int))
+    return result
+
+
+def hours(units):
+    return units / UNITS_PER_HOUR
+
+
+def generate(experts=10, tasks=50, days=365, links=0.1, bounds=0.1, holidays=10, today=None, seed=0):
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp(today or datetime.date.today()).normalize()
+    dates, working, holiday_dates = calendar(rng, today, days, holidays)
+    last = days - 1
+
+    expert_names = [f"Expert{e + 1:03d}" for e in range(experts)]
+    task_names = [f"Task{t + 1:04d}" for t in range(tasks)]
+
+    # Tasks of at least two weeks, or the whole horizon if it is shorter
+    length = rng.integers(min(14, days), days + 1, size=tasks)
+    start = rng.integers(0, days - length + 1)
+    end = start + length - 1
+
+    # Each task is linked with at least one expert
+    link = rng.random((experts, tasks)) < links
+    alone = ~link.any(axis=0)
+    link[rng.integers(0, experts, size=alone.sum()), np.flatnonzero(alone)] = True
+
+    units = plan(rng, link, start, end, working)
+    work = np.zeros(tasks)
+    for e in range(experts):
+        np.add.at(work, np.flatnonzero(link[e]), units[e].sum(axis=1))
+
+    xbday, xbsum, ubsum = [], [], []
+    for e in range(experts):
+        for row, t in enumerate(np.flatnonzero(link[e])):
+            for sheet in [xbday, xbsum, ubsum]:
+                if rng.random() >= bounds:
+                    continue
+                a, b = subrange(rng, start[t], end[t])
+                x = units[e][row, a:b + 1][working[a:b + 1]]
+                if x.size == 0:
+                    continue
+                key = [expert_names[e], task_names[t], dates[a], dates[b]]
+                if sheet is xbday:
+                    sheet.append(key + [hours(x.min()), hours(x.max())])
+                elif sheet is xbsum:
+                    sheet.append(key + [hours(np.floor(0.9 * x.sum())), hours(np.ceil(1.1 * x.sum()))])
+                else:
+                    n = np.count_nonzero(x)
+                    sheet.append(key + [int(0.8 * n), min(x.size, int(np.ceil(1.2 * n)))])
+
+    ubday, expert_bounds = [], []
+    for e in range(experts):
+        for sheet in [ubday, expert_bounds]:
+            if rng.random() >= bounds:
+                continue
+            a, b = subrange(rng, 0, last)
+            x = units[e][:, a:b + 1][:, working[a:b + 1]]
+            if x.shape[1] == 0:
+                continue
+            if sheet is ubday:
+                n = np.count_nonzero(x, axis=0)
+                sheet.append([expert_names[e], dates[a], dates[b], int(n.min()), int(n.max())])
+            else:
+                total = x.sum(axis=0)
+                sheet.append([expert_names[e], dates[a], dates[b], hours(total.min()), hours(total.max())])
+
+    # Calendar months, the last one cut at the end of the horizon
+    months = pd.date_range(dates[0].to_period("M").start_time, dates[-1], freq="MS")
+    periods = pd.DataFrame({
+        "Name": months.strftime("%y.%b"),
+        "Start": months,
+        "End": pd.Series(months + pd.offsets.MonthEnd(0)).clip(upper=dates[-1]),
+    })
+
+    periods_bounds = []
+    for e in range(experts):
+        total = units[e].sum(axis=0) * working
+        for p in periods.itertuples(index=False):
+            if rng.random() >= bounds:
+                continue
+            s = total[(dates >= p.Start) & (dates <= p.End)].sum()
+            periods_bounds.append([expert_names[e], p.Name, np.floor(0.9 * hours(s)), np.ceil(1.1 * hours(s))])
+
+    window = [dates[0], dates[min(20, last)]]
+    return {
+        "experts": pd.DataFrame({"Name": expert_names, "Comment": [f"{n} tasks" for n in link.sum(axis=1)]}),
+        "tasks": pd.DataFrame({"Name": task_names, "Start": dates[start], "End": dates[end], "Work": hours(work)}),
+        "links": pd.DataFrame(
+            [(expert_names[e], task_names[t]) for e, t in zip(*np.nonzero(link))], columns=["Expert", "Task"]
+        ),
+        "xbday": pd.DataFrame(xbday, columns=["Expert", "Task", "Start", "End", "Lower", "Upper"]),
+        "xbsum": pd.DataFrame(xbsum, columns=["Expert", "Task", "Start", "End", "Lower", "Upper"]),
+        "ubday": pd.DataFrame(ubday, columns=["Expert", "Start", "End", "Lower", "Upper"]),
+        "ubsum": pd.DataFrame(ubsum, columns=["Expert", "Task", "Start", "End", "Lower", "Upper"]),
+        "expert bounds": pd.DataFrame(expert_bounds, columns=["Expert", "Start", "End", "Lower", "Upper"]),
+        "invoicing periods": periods,
+        "invoicing periods bounds": pd.DataFrame(periods_bounds, columns=["Expert", "Period", "Lower", "Upper"]),
+        "public holidays": pd.DataFrame({"Date": holiday_dates}),
+        "misc": pd.DataFrame({
+            "Today": [today], "Hours per day": [HOURS_PER_DAY], "Solver": ["highs"], "Last day": [dates[-1]],
+        }),
+        "himg": pd.DataFrame({
+            "Hours per day": [None], "Width": [12], "Height": [6], "Dpi": [300], "Start": [window[0]],
+            "End": [window[1]], "Bar:color": ["#2ca02c"], "Bar:hatch": ["/"], "Bar:alpha": [0.3],
+        }),
+        "timg": pd.DataFrame({
+            "Tasks per day": [None], "Width": [12], "Height": [6], "Dpi": [300], "Start": [window[0]],
+            "End": [window[1]], "Bar:color": ["#d62728"], "Bar:hatch": ["\\"], "Bar:alpha": [0.3],
+        }),
+        "simg": pd.DataFrame({
+            "Stacked hours per day": [None], "Width": [12], "Height": [6], "Dpi": [300], "Start": [window[0]],
+            "End": [window[1]], "Bar:alpha": [0.6],
+        }),
+        "gimg": pd.DataFrame({
+            "Task's Gantt Chart": [None], "Width": [8], "Height": [4], "Dpi": [150],
+            "Barh:color": ["#ff7f0e"], "Barh:height": [0.9], "Barh:alpha": [0.6],
+        }),
+        "wimg": pd.DataFrame({
+            "Invoicing Periods Workload": [None], "Width": [8], "Height": [4], "Dpi": [150],
+            "Bar:color": ["#7BC8F6"], "Bar:ecolor": ["#EE0000"], "Bar:capsize": [4],
+        }),
+        "bimg": pd.DataFrame({
+            "Task with bounds": [None], "Width": [8], "Height": [4], "Dpi": [150], "Fill:color": ["#90EE90"],
+            "Fill:hatch": ["/"], "Fill:alpha": [0.2], "Plot:format": ["o"], "Plot:markeredgewidth": [0.5],
+            "Step:linewidth": [0.5],
+        }),
+    }
+
+
+def write(path, sheets):
+    with pd.ExcelWriter(path, engine="openpyxl", datetime_format="YYYY-MM-DD", date_format="YYYY-MM-DD") as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic feasible Yumbo workbook.")
+    parser.add_argument("path", help="the workbook to write (.xlsx)")
+    parser.add_argument("-e", "--experts", type=int, default=10, help="number of experts (default: 10)")
+    parser.add_argument("-t", "--tasks", type=int, default=50, help="number of tasks (default: 50)")
+    parser.add_argument("-d", "--days", type=int, default=365, help="length of the horizon in days (default: 365)")
+    parser.add_argument("--links", type=float, default=0.1,
+                        help="probability that an expert is linked with a task (default: 0.1)")
+    parser.add_argument("--bounds", type=float, default=0.1,
+                        help="probability of each bound row: per link for xbday, xbsum and ubsum, "
+                             "per expert for ubday and expert bounds, per expert and period for invoicing periods bounds "
+                             "(default: 0.1)")
+    parser.add_argument("--holidays", type=int, default=10, help="number of public holidays (default: 10)")
+    parser.add_argument("--today", help="the Today of the workbook, YYYY-MM-DD (default: today)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    args = parser.parse_args()
+
+    sheets = generate(args.experts, args.tasks, args.days, args.links, args.bounds, args.holidays, args.today, args.seed)
+    write(args.path, sheets)
+    print(f"{args.path}: {args.experts} experts, {args.tasks} tasks, {sheets['links'].shape[0]} links, {args.days} days")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+import os
+import subprocess
+import sys
+import yumbo_synth
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Two workbooks with independent groups, so that each of them starts its own worker processes
+def test_batch_solves_two_workbooks(tmp_path):
+    for seed in range(2):
+        sheets = yumbo_synth.generate(experts=6, tasks=6, days=60, links=0.15, bounds=0, seed=seed)
+        sheets["misc"]["Engine"] = "highspy"
+        yumbo_synth.write(str(tmp_path / f"workbook{seed}.xlsx"), sheets)
+
+    output = tmp_path / "output"
+    env = dict(os.environ, YUMBO_CACHE_MB="0")
+    subprocess.run(
+        [sys.executable, os.path.join(root, "src", "yumbo_batch.py"), "-o", str(output), "-j", "2", str(tmp_path)],
+        cwd=root, env=env, check=True, timeout=300,
+    )
+    assert (output / "summary.csv").exists()
+    assert (output / "workbook0").is_dir() and (output / "workbook1").is_dir()
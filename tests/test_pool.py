@@ -0,0 +1,38 @@
+import threading
+import time
+import romz_pool
+
+
+def fast(value):
+    return value
+
+
+def slow(value):
+    time.sleep(60)
+    return value
+
+
+def test_race_returns_the_first_accepted_result():
+    entrants = [("fast", fast, (1,)), ("slow", slow, (2,))]
+    start = time.monotonic()
+    winner, results, times = romz_pool.race(entrants, lambda r: r == 1)
+    assert winner == "fast"
+    assert results == {"fast": 1}
+    assert set(times) == {"fast", "slow"}
+    assert time.monotonic() - start < 30
+
+
+def test_race_stops_when_the_event_is_set():
+    stop = threading.Event()
+    stop.set()
+    start = time.monotonic()
+    winner, results, times = romz_pool.race([("slow", slow, (1,))], lambda r: True, stop)
+    assert winner is None
+    assert results == {}
+    assert time.monotonic() - start < 30
+
+
+def test_race_without_a_winner():
+    winner, results, times = romz_pool.race([("fast", fast, (1,))], lambda r: False, threading.Event())
+    assert winner is None
+    assert results == {"fast": 1}
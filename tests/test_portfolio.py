@@ -0,0 +1,30 @@
+import multiprocessing
+import time
+import pandas as pd
+import romz_ampl
+
+
+def fast(data, x0, settings):
+    return {"output": "fast output", "solve_result": "solved", "x": x0, "day_no": 1, "gap": None, "times": {}}
+
+
+def slow(data, x0, settings):
+    time.sleep(60)
+    return fast(data, x0, settings)
+
+
+def test_portfolio_returns_the_winner_and_cancels_the_loser(monkeypatch):
+    monkeypatch.setattr(romz_ampl, "engines", lambda: {"fast": fast, "slow": slow})
+    x0 = pd.DataFrame({"Expert": ["e"], "Day": [1], "Task": ["t"], "X": [4]})
+    settings = {"portfolio": ["slow", "fast"], "cancel": None}
+
+    start = time.monotonic()
+    r = romz_ampl.portfolio({}, x0, settings)
+
+    assert time.monotonic() - start < 30
+    assert r["solve_result"] == "solved"
+    assert r["x"].equals(x0)
+    assert r["output"].startswith("=== PORTFOLIO: fast WON ===")
+    assert "slow: " in r["output"] and "cancelled" in r["output"]
+    assert "fast output" in r["output"]
+    assert multiprocessing.active_children() == []
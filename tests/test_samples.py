@@ -0,0 +1,76 @@
+import glob
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import glb
+import romz_ampl
+import romz_cache
+import romz_check
+import romz_highs
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+samples = sorted(glob.glob(os.path.join(root, "ampl-data-input-excel", "*", "*.xlsx")))
+
+# The solve modes, as the settings of the misc sheet
+modes = {
+    "plain": {"Decompose": 0},
+    "decomposed": {"Decompose": 1},
+    "rolling": {"Decompose": 0, "Rolling horizon": 20},
+    "coarse-to-fine": {"Decompose": 0, "Coarse units per hour": 1},
+    "portfolio": {"Decompose": 0, "Portfolio": "highspy, greedy"},
+}
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.setattr(romz_cache, "max_size", 0)
+
+
+# The hours of the saved schedules as the sparse frame (Expert, Day, Task, X) in units
+def scheduled(units):
+    frames = []
+    for expert in glb.data["experts"]["Name"]:
+        df = glb.data[f"schedule {expert}"].astype(float)
+        df.columns = (pd.DatetimeIndex(df.columns) - glb.today()).days
+        df = df.stack().rename("X").rename_axis(["Task", "Day"]).reset_index()
+        frames.append(df[df["X"] > 0].assign(Expert=expert))
+    x = pd.concat(frames, ignore_index=True)
+    return x.assign(X=x["X"] * units)
+
+
+# The schedule x must be within the cells of the model and meet all the rows of its matrix
+def check_feasible(data, x):
+    cells, columns, blocks = romz_highs.model(data)
+    x = x.merge(cells, on=["Expert", "Day", "Task"], how="left")
+    assert not x["Col"].isna().any(), "hours outside the cells of the model"
+
+    values = np.zeros(columns["cost"].size)
+    values[x["Col"].to_numpy(dtype=int)] = x["X"].to_numpy()
+    ucol = x["UCol"].to_numpy(dtype=int)
+    values[ucol[ucol >= 0]] = 1
+    assert np.all(values >= columns["lower"] - 1e-6)
+    assert np.all(values <= columns["upper"] + 1e-6)
+
+    a, lower, upper = romz_highs.matrix(columns, blocks)
+    row = a @ values
+    assert np.all(row >= lower - 1e-6)
+    assert np.all(row <= upper + 1e-6)
+
+
+@pytest.mark.parametrize("mode", modes)
+@pytest.mark.parametrize("path", samples, ids=[os.path.basename(p) for p in samples])
+def test_sample_is_solved(path, mode):
+    glb.data.bind({})
+    with open(path, "rb") as f:
+        glb.load(f.read())
+    glb.data["misc"]["Engine"] = "highspy"
+    for key, value in modes[mode].items():
+        glb.data["misc"][key] = value
+    assert romz_check.analyse() == []
+
+    romz_ampl.solve(os.path.basename(path))
+
+    assert glb.data["solve result"] in ["solved", "limit"]
+    data = romz_ampl.translate()
+    check_feasible(data, scheduled(data["UNITS_PER_HOUR"]))